@@ -0,0 +1,76 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import click
+import pandas as pd
+
+from stages import dataframes, export, merge
+from .generator import generate_daos
+
+
+def get_synthetic_report(rows: int) -> pd.DataFrame:
+    return merge.into_single_tables(
+        dataframes.all_proposals(generate_daos(rows))
+    ).denormalize()
+
+
+def legacy_writer(report: pd.DataFrame, file_name: str):
+    report.to_csv(file_name + ".gzip", chunksize=50, compression="gzip")
+
+
+def chunked_writer(
+    report: pd.DataFrame, file_name: str, compression: str, level: int | None
+):
+    with export.CsvWriter(file_name, compression, level) as writer:
+        writer.write(report)
+
+
+def get_writers(levels: dict[str, int | None]) -> dict[str, callable]:
+    writers = {"legacy gzip (chunksize=50)": legacy_writer}
+    for compression in export.CSV_COMPRESSIONS:
+        level = levels.get(compression)
+        level_name = level or export.DEFAULT_COMPRESSION_LEVELS.get(compression)
+        writers[f"{compression} (level {level_name or 'default'})"] = (
+            lambda report, file_name, compression=compression, level=level: (
+                chunked_writer(report, file_name, compression, level)
+            )
+        )
+    return writers
+
+
+def measure(writer: callable, report: pd.DataFrame, directory: Path) -> tuple:
+    file_name = str(directory / "report.csv")
+    start = perf_counter()
+    writer(report, file_name)
+    elapsed = perf_counter() - start
+
+    output_size = sum(path.stat().st_size for path in directory.iterdir())
+    for path in directory.iterdir():
+        path.unlink()
+    return elapsed, output_size
+
+
+@click.command()
+@click.option("-r", "--rows", default=500_000, show_default=True, type=int)
+@click.option("--gzip_level", type=int, help="[default: 6]")
+@click.option("--zstd_level", type=int, help="[default: codec default]")
+@click.option("--lz4_level", type=int, help="[default: codec default]")
+def run(rows: int, gzip_level: int, zstd_level: int, lz4_level: int):
+    report = get_synthetic_report(rows)
+    csv_size = len(report.to_csv().encode())
+    click.echo(f"{rows} rows, {csv_size / 1024**2:.1f} MiB of CSV")
+
+    levels = {"gzip": gzip_level, "zstd": zstd_level, "lz4": lz4_level}
+    with TemporaryDirectory() as directory:
+        for name, writer in get_writers(levels).items():
+            elapsed, output_size = measure(writer, report, Path(directory))
+            click.echo(
+                f"{name:<30} {elapsed:7.2f}s "
+                f"{csv_size / 1024**2 / elapsed:8.1f} MiB/s "
+                f"{output_size / 1024**2:8.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,254 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from stages.dataframe_filters.data_processing.reaggregation import CHOICE_DECODERS
+from stages.extract.data_processing import snapshot, tally
+
+
+SNAPSHOT_PROPOSAL_TYPES = list(CHOICE_DECODERS)
+TALLY_CHOICES = ["AGAINST", "FOR", "ABSTAIN"]
+# Tally weights are token amounts with 18 decimals
+TALLY_DECIMALS = 10**18
+START_TIMESTAMP = 1672531200
+PROPOSAL_DURATION = 7 * 86400
+
+
+def get_voter_pool(
+    rng: np.random.Generator, number_of_voters: int, exponent: float
+) -> tuple[list[str], np.ndarray]:
+    voters = [f"0x{rng.bytes(20).hex()}" for _ in range(number_of_voters)]
+    # Every voter keeps their voting power across proposals, jittered so
+    # that few of them tie
+    vp = rng.zipf(exponent, number_of_voters) * rng.uniform(1, 2, number_of_voters)
+    return voters, vp
+
+
+def get_choices(
+    rng: np.random.Generator, proposal_type: str, number_of_choices: int, size: int
+) -> tuple[list, np.ndarray]:
+    if proposal_type == "approval":
+        approved = rng.random((size, number_of_choices)) < 0.4
+        approved[np.arange(size), rng.integers(0, number_of_choices, size)] = True
+        choices = [
+            (np.flatnonzero(vote_approved) + 1).tolist() for vote_approved in approved
+        ]
+        return choices, approved.astype(np.float64)
+
+    if proposal_type == "weighted":
+        weights = rng.integers(0, 100, (size, number_of_choices))
+        weights[np.arange(size), rng.integers(0, number_of_choices, size)] += 1
+        choices = [
+            {
+                str(choice_index + 1): weight
+                for choice_index, weight in enumerate(vote_weights)
+                if weight
+            }
+            for vote_weights in weights.tolist()
+        ]
+        return choices, weights / weights.sum(axis=1, keepdims=True)
+
+    choice_indexes = rng.integers(0, number_of_choices, size)
+    shares = np.zeros((size, number_of_choices))
+    shares[np.arange(size), choice_indexes] = 1.0
+    return (choice_indexes + 1).tolist(), shares
+
+
+def make_snapshot_proposal(
+    rng: np.random.Generator,
+    proposal_id: str,
+    organization: tuple[str, str],
+    proposal_type: str,
+    voter_pool: tuple[list[str], np.ndarray],
+    number_of_votes: int,
+    created: int,
+) -> dict[str, dict]:
+    organization_name, organization_id = organization
+    voters, voter_vp = voter_pool
+    voter_indexes = rng.choice(len(voters), number_of_votes, replace=False)
+    vp = voter_vp[voter_indexes]
+
+    number_of_choices = 3 if proposal_type == "basic" else int(rng.integers(2, 7))
+    choices, shares = get_choices(rng, proposal_type, number_of_choices, len(vp))
+    scores = (vp @ shares).tolist()
+    vote_created = created + rng.integers(0, PROPOSAL_DURATION, len(vp))
+
+    # Every vote of the hub response embeds the same proposal
+    raw_proposal = {
+        "id": proposal_id,
+        "title": f"Proposal {proposal_id}",
+        "scores": scores,
+        "scores_total": sum(scores),
+        "state": "closed",
+        "space": {"id": organization_id, "name": organization_name},
+        "type": proposal_type,
+        "created": created,
+        "start": created,
+        "end": created + PROPOSAL_DURATION,
+        "choices": [
+            f"Choice {choice_number}"
+            for choice_number in range(1, number_of_choices + 1)
+        ],
+        "votes": len(vp),
+        "snapshot": "0",
+        "network": "1",
+    }
+    votes = [
+        snapshot.sanitize_vote(
+            {
+                "id": f"{proposal_id}-{vote_index}",
+                "voter": voters[voter_index],
+                "choice": choice,
+                "created": vote_timestamp,
+                "vp": vote_vp,
+                "proposal": raw_proposal,
+            }
+        )
+        for vote_index, (voter_index, choice, vote_timestamp, vote_vp) in enumerate(
+            zip(voter_indexes.tolist(), choices, vote_created.tolist(), vp.tolist())
+        )
+    ]
+    return {
+        proposal_id: {
+            "proposal": {
+                "id": proposal_id,
+                "organization_name": organization_name,
+                "organization_id": organization_id,
+            },
+            "proposal_row": snapshot.sanitize_proposal(
+                raw_proposal, f"{organization_name}ID"
+            ),
+            "votes": votes,
+        }
+    }
+
+
+def get_timestamp(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_tally_proposal(
+    rng: np.random.Generator,
+    proposal_id: str,
+    organization: tuple[str, str],
+    voter_pool: tuple[list[str], np.ndarray],
+    number_of_votes: int,
+    created: int,
+) -> dict[str, dict]:
+    organization_name, organization_id = organization
+    voters, voter_vp = voter_pool
+    voter_indexes = rng.choice(len(voters), number_of_votes, replace=False)
+    weights = [
+        int(vote_vp * 1000) * (TALLY_DECIMALS // 1000)
+        for vote_vp in voter_vp[voter_indexes].tolist()
+    ]
+    supports = rng.integers(0, len(TALLY_CHOICES), number_of_votes).tolist()
+    scores = [0] * len(TALLY_CHOICES)
+    for support, weight in zip(supports, weights):
+        scores[support] += weight
+    vote_created = created + rng.integers(0, PROPOSAL_DURATION, number_of_votes)
+
+    # Tally sends token amounts as strings
+    raw_proposal = {
+        "id": proposal_id,
+        "title": f"Proposal {proposal_id}",
+        "start": {"timestamp": get_timestamp(created)},
+        "end": {"timestamp": get_timestamp(created + PROPOSAL_DURATION)},
+        "voteStats": [
+            {
+                "support": choice,
+                "weight": str(score),
+                "votes": supports.count(support),
+                "percent": 100 * score / max(sum(scores), 1),
+            }
+            for support, (choice, score) in enumerate(zip(TALLY_CHOICES, scores))
+        ],
+        "organization_name": organization_name,
+        "organization_id": organization_id,
+    }
+    proposal_row = tally.sanitize_proposal(raw_proposal, organization_id)
+    votes = [
+        tally.sanitize_vote(
+            {
+                "id": f"{proposal_id}-{vote_index}",
+                "voter": {"address": voters[voter_index], "ens": None},
+                "support": TALLY_CHOICES[support],
+                "weight": str(weight),
+                "reason": "",
+                "transaction": {"block": {"timestamp": get_timestamp(vote_timestamp)}},
+            },
+            proposal_row,
+        )
+        for vote_index, (voter_index, weight, support, vote_timestamp) in enumerate(
+            zip(voter_indexes.tolist(), weights, supports, vote_created.tolist())
+        )
+    ]
+    return {
+        proposal_id: {
+            "proposal": raw_proposal,
+            "proposal_row": proposal_row,
+            "votes": votes,
+        }
+    }
+
+
+def generate_daos(
+    number_of_votes: int,
+    number_of_daos: int = 4,
+    proposals_per_dao: int = 20,
+    tally_daos: int = 1,
+    exponent: float = 1.5,
+    seed: int = 0,
+) -> list[dict[str, dict]]:
+    rng = np.random.default_rng(seed)
+    number_of_proposals = number_of_daos * proposals_per_dao
+    votes_per_proposal = np.full(
+        number_of_proposals, number_of_votes // number_of_proposals
+    )
+    votes_per_proposal[: number_of_votes % number_of_proposals] += 1
+
+    daos = []
+    for dao_index in range(number_of_daos):
+        is_tally = dao_index < tally_daos
+        organization = (f"DAO {dao_index}", f"dao{dao_index}.eth")
+        dao_votes = votes_per_proposal[
+            dao_index * proposals_per_dao : (dao_index + 1) * proposals_per_dao
+        ]
+        # Voters come back for several proposals, as they do in real DAOs
+        voter_pool = get_voter_pool(rng, 2 * int(dao_votes.max(initial=1)), exponent)
+
+        dao: dict[str, dict] = dict()
+        for proposal_index, proposal_votes in enumerate(dao_votes.tolist()):
+            # Tally ids are uint256 hashes in decimal, Snapshot ids in hex
+            proposal_hash = rng.bytes(32)
+            created = START_TIMESTAMP + proposal_index * PROPOSAL_DURATION
+            if is_tally:
+                proposal_id = str(int.from_bytes(proposal_hash, "big"))
+                dao.update(
+                    make_tally_proposal(
+                        rng,
+                        proposal_id,
+                        organization,
+                        voter_pool,
+                        proposal_votes,
+                        created,
+                    )
+                )
+            else:
+                proposal_id = f"0x{proposal_hash.hex()}"
+                proposal_type = SNAPSHOT_PROPOSAL_TYPES[
+                    proposal_index % len(SNAPSHOT_PROPOSAL_TYPES)
+                ]
+                dao.update(
+                    make_snapshot_proposal(
+                        rng,
+                        proposal_id,
+                        organization,
+                        proposal_type,
+                        voter_pool,
+                        proposal_votes,
+                        created,
+                    )
+                )
+        daos.append(dao)
+    return daos
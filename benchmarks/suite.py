@@ -0,0 +1,238 @@
+import json
+import platform
+import resource
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from io import StringIO
+from os import cpu_count
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable
+
+import click
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from stages import dataframe_filters, dataframes, export, merge
+from stages.dataframe_filters.data_processing import filters, statistics
+from .generator import generate_daos
+
+
+RESULTS_DIRECTORY = Path(__file__).parent / "results"
+WHALE_QUARTILE = 0.95
+SENSITIVITY_QUARTILES = [0.9, 0.95, 0.99]
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(function: Callable[[], Any], repeat: int, memory: bool) -> tuple:
+    # The stages print their progress, which would drown the results
+    with redirect_stdout(StringIO()):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            result = function()
+            timings.append(perf_counter() - start)
+
+        peak_memory = None
+        if memory:
+            # Tracing slows the stage down, so it gets a run of its own
+            del result
+            tracemalloc.start()
+            result = function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return result, {
+        "seconds": min(timings),
+        "peak_memory_mib": peak_memory / 1024**2 if memory else None,
+    }
+
+
+class Suite:
+    def __init__(self, repeat: int, memory: bool):
+        self.repeat = repeat
+        self.memory = memory
+        self.stages: dict[str, dict] = dict()
+
+    def run(self, name: str, function: Callable[[], Any]) -> Any:
+        result, self.stages[name] = measure(function, self.repeat, self.memory)
+        peak_memory = self.stages[name]["peak_memory_mib"]
+        click.echo(
+            f"{name:<25} {self.stages[name]['seconds']:8.3f}s"
+            + (f" {peak_memory:10.1f} MiB" if peak_memory is not None else "")
+        )
+        return result
+
+
+def run_stages(suite: Suite, daos: list[dict[str, dict]], directory: Path):
+    proposal_tables = suite.run("all_proposals", lambda: dataframes.all_proposals(daos))
+    unfiltered = suite.run(
+        "into_single_tables", lambda: merge.into_single_tables(proposal_tables)
+    )
+    whale_mask = suite.run(
+        "get_whale_mask",
+        lambda: filters.get_whale_mask(unfiltered.votes, WHALE_QUARTILE).to_numpy(),
+    )
+    suite.run(
+        "reaggregate_votes",
+        lambda: dataframe_filters.reaggregate_votes(
+            unfiltered.votes[whale_mask], unfiltered.proposals
+        ),
+    )
+    filtered = suite.run(
+        "filter_top_shareholders",
+        lambda: dataframe_filters.filter_top_shareholders_from_tables(unfiltered),
+    )
+    suite.run(
+        "whale_sensitivity",
+        lambda: dataframe_filters.whale_sensitivity(unfiltered, SENSITIVITY_QUARTILES),
+    )
+    suite.run(
+        "organization_statistics",
+        lambda: statistics.get_organization_statistics(unfiltered, filtered),
+    )
+    suite.run(
+        "csv_export",
+        lambda: export.organization_dataframes_to_csv(
+            unfiltered, str(directory / "report.csv")
+        ),
+    )
+    suite.run(
+        "parquet_export",
+        lambda: export.organization_dataframes_to_parquet(
+            unfiltered, str(directory / "report")
+        ),
+    )
+
+
+def compare_results(results: dict, baseline: dict):
+    click.echo(f"\nCompared to {baseline.get('commit') or 'baseline'}:")
+    for name, stage in results["stages"].items():
+        baseline_stage = baseline["stages"].get(name)
+        if not baseline_stage:
+            continue
+        click.echo(
+            f"{name:<25} {stage['seconds'] / baseline_stage['seconds']:7.2f}x time"
+            + (
+                f" {stage['peak_memory_mib'] / baseline_stage['peak_memory_mib']:7.2f}x"
+                " memory"
+                if stage["peak_memory_mib"] and baseline_stage.get("peak_memory_mib")
+                else ""
+            )
+        )
+
+
+@click.command()
+@click.option("-v", "--votes", default=1_000_000, show_default=True, type=int)
+@click.option("--daos", default=4, show_default=True, type=int)
+@click.option("--proposals_per_dao", default=20, show_default=True, type=int)
+@click.option(
+    "--tally_daos",
+    default=1,
+    show_default=True,
+    type=int,
+    help="Number of DAOs shaped like Tally payloads, the rest are Snapshot ones.",
+)
+@click.option(
+    "--exponent",
+    default=1.5,
+    show_default=True,
+    type=click.FloatRange(1, min_open=True),
+    help="Zipf exponent of the voting power.",
+)
+@click.option("--seed", default=0, show_default=True, type=int)
+@click.option("-r", "--repeat", default=3, show_default=True, type=click.IntRange(1))
+@click.option(
+    "--memory/--no_memory",
+    default=True,
+    show_default=True,
+    help="Track the peak memory of every stage in an extra traced run.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="[default: benchmarks/results/<commit>.json]",
+)
+@click.option(
+    "-c",
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Results of an earlier run to compare against.",
+)
+def run(
+    votes: int,
+    daos: int,
+    proposals_per_dao: int,
+    tally_daos: int,
+    exponent: float,
+    seed: int,
+    repeat: int,
+    memory: bool,
+    output: Path | None,
+    compare: Path | None,
+):
+    parameters = {
+        "votes": votes,
+        "daos": daos,
+        "proposals_per_dao": proposals_per_dao,
+        "tally_daos": tally_daos,
+        "exponent": exponent,
+        "seed": seed,
+        "repeat": repeat,
+    }
+    start = perf_counter()
+    dao_snapshot_datas = generate_daos(
+        votes, daos, proposals_per_dao, tally_daos, exponent, seed
+    )
+    click.echo(f"Generated {votes} votes in {perf_counter() - start:.1f}s")
+
+    suite = Suite(repeat, memory)
+    with TemporaryDirectory() as directory:
+        run_stages(suite, dao_snapshot_datas, Path(directory))
+
+    commit = get_commit()
+    results = {
+        "commit": commit,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "cpu_count": cpu_count(),
+        "versions": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "pyarrow": pa.__version__,
+        },
+        "parameters": parameters,
+        # Linux reports the peak resident set size in KiB
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": suite.stages,
+    }
+
+    output = output or RESULTS_DIRECTORY / f"{commit or 'results'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    click.echo(f"Results saved to {output}")
+
+    if compare:
+        compare_results(results, json.loads(compare.read_text()))
+
+
+if __name__ == "__main__":
+    run()
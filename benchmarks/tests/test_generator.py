@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import SNAPSHOT_PROPOSAL_TYPES, generate_daos
+from stages import dataframe_filters, dataframes, merge
+from stages.dataframe_filters.data_processing.reaggregation import get_choice_matrix
+from stages.tests.constants import dao_snapshot_data
+
+
+def get_single_tables():
+    return merge.into_single_tables(
+        dataframes.all_proposals(generate_daos(2_000, 3, 8, tally_daos=1))
+    )
+
+
+def test_generate_daos_is_deterministic():
+    assert generate_daos(500, 2, 4, seed=1) == generate_daos(500, 2, 4, seed=1)
+    assert generate_daos(500, 2, 4, seed=1) != generate_daos(500, 2, 4, seed=2)
+
+
+def test_generated_daos_cover_every_proposal_type():
+    single_tables = get_single_tables()
+
+    assert len(single_tables.votes) == 2_000
+    assert set(single_tables.proposals["proposal_type"]) == set(SNAPSHOT_PROPOSAL_TYPES)
+    assert list(single_tables.proposals["proposal_organization_name"].unique()) == [
+        "DAO 0",
+        "DAO 1",
+        "DAO 2",
+    ]
+
+
+def test_generated_snapshot_payloads_match_the_fixtures():
+    generated_dao = generate_daos(500, 2, 4, tally_daos=0)[0]
+    generated_payload = next(iter(generated_dao.values()))
+    fixture_payload = next(iter(dao_snapshot_data[0].values()))
+
+    for key in ["proposal", "proposal_row"]:
+        assert list(generated_payload[key]) == list(fixture_payload[key])
+    assert list(generated_payload["votes"][0]) == list(fixture_payload["votes"][0])
+
+    generated_tables = merge.into_single_tables(
+        dataframes.all_proposals([generated_dao])
+    )
+    fixture_tables = merge.into_single_tables(
+        dataframes.all_proposals(dao_snapshot_data)
+    )
+    # Categories differ between the two, only the kind of each column matters
+    for table in ["proposals", "votes"]:
+        pd.testing.assert_series_equal(
+            getattr(generated_tables, table).dtypes.astype(str),
+            getattr(fixture_tables, table).dtypes.astype(str),
+        )
+
+
+def test_generated_scores_add_up_to_the_votes():
+    single_tables = get_single_tables()
+
+    for proposal_id, proposal in single_tables.proposals.iterrows():
+        votes = single_tables.votes[single_tables.votes["proposal_id"] == proposal_id]
+        choice_matrix = get_choice_matrix(
+            votes["choice"],
+            proposal["proposal_type"],
+            len(proposal["proposal_scores"]),
+        )
+        np.testing.assert_allclose(
+            votes["vp"].to_numpy() @ choice_matrix,
+            np.array(proposal["proposal_scores"], dtype=float),
+        )
+
+
+def test_generated_daos_go_through_the_filter():
+    single_tables = get_single_tables()
+    filtered_tables = dataframe_filters.filter_top_shareholders_from_tables(
+        single_tables
+    )
+
+    assert 0 < len(filtered_tables.votes) < len(single_tables.votes)
+    pd.testing.assert_index_equal(
+        filtered_tables.proposals.index, single_tables.proposals.index
+    )
@@ -3,7 +3,8 @@ from json import loads
 
 from click import ParamType
 from click.core import Context, Parameter
-from pandas import DataFrame
+
+from stages.datatypes import ProposalTables
 
 
 @dataclass
@@ -16,15 +17,9 @@ class DaoData:
 
 
 @dataclass
-class RawReports:
-    filtered: list[DataFrame]
-    unfiltered: list[DataFrame]
-
-
-@dataclass
-class Reports(RawReports):
-    filtered: DataFrame
-    unfiltered: DataFrame
+class Reports:
+    filtered: ProposalTables
+    unfiltered: ProposalTables
 
 
 class Blacklist(ParamType):
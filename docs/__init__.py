@@ -16,4 +16,53 @@ help = {
     \b
     Exclude the listed DAOs. e.g. '["Fei", "OlympusDAO"]'
     """,
+    "concurrency": """
+    Maximum number of proposals, governances or token lookups fetched at the
+    same time for each DAO.
+    """,
+    "dao_concurrency": """
+    Maximum number of DAOs extracted at the same time. Has no effect if `-d`
+    or `-t` is used.
+    """,
+    "snapshot_rate": """
+    Snapshot requests per second. The default keeps to the hub's limit of 60
+    requests a minute without an API key.
+    """,
+    "cache": """
+    Reuse API responses stored in `./.cache`. Votes of closed proposals never
+    expire.
+    """,
+    "incremental": """
+    Only fetch proposals created since the last incremental run, plus the ones
+    still active or pending, and merge them with the stored proposals.
+    """,
+    "stream": """
+    Turn each proposal into report rows and write them as soon as its votes
+    arrive, instead of keeping every DAO in memory until the export.
+    """,
+    "format": """
+    Write the full reports as compressed CSV files or as Parquet datasets
+    partitioned by organization.
+    """,
+    "compression": """
+    \b
+    Compression codec of the reports.
+    CSV supports gzip, zstd, lz4 and none.
+    [default: gzip for CSV, zstd for Parquet]
+    """,
+    "compression_level": """
+    Compression level of the codec. [default: 6 for gzip CSV, codec default
+    otherwise]
+    """,
+    "workers": """
+    Number of processes that turn the DAOs into reports and filter them, one
+    DAO at a time per process. Has no effect if `-s` is used.
+    """,
+    "whale_quartile": """
+    Also write a whale sensitivity table with the filtered scores, winner
+    flips and whale voting power share of each proposal when the whales are
+    the votes at or above this voting power quantile. Repeat it to compare
+    several cut-offs in one run, e.g. `--whale_quartile 0.9 --whale_quartile
+    0.99`. Not available with `-s`.
+    """,
 }
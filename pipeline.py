@@ -1,8 +1,11 @@
-from asyncio import run as asyncio_run
+from asyncio import run as asyncio_run, to_thread
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator
 
 import click
+import pyarrow as pa
 
-from datatypes import Blacklist, DaoData, RawReports, Reports
+from datatypes import Blacklist, DaoData, Reports
 from docs import help
 from stages import (
     dataframes,
@@ -10,42 +13,235 @@ from stages import (
     export,
     merge,
     extract,
+    transform,
 )
+from stages.datatypes import ProposalTables
 
 
-def get_reports(raw_reports: RawReports) -> Reports:
+def get_reports(api_response: DaoData, workers: int = 1) -> Reports:
+    if workers > 1:
+        report_tables = list(
+            transform.transform_in_parallel(api_response.raw_dao_data, workers)
+        )
+        return Reports(
+            merge.into_single_tables([filtered for _, filtered in report_tables]),
+            merge.into_single_tables([unfiltered for unfiltered, _ in report_tables]),
+        )
+
+    unfiltered_report = merge.into_single_tables(
+        dataframes.all_proposals(api_response.raw_dao_data)
+    )
     return Reports(
-        merge.into_single_dataframe(raw_reports.filtered),
-        merge.into_single_dataframe(raw_reports.unfiltered),
+        dataframe_filters.filter_top_shareholders(unfiltered_report),
+        unfiltered_report,
     )
 
 
-def get_raw_reports(api_response: DaoData) -> RawReports:
-    proposal_dataframes = dataframes.all_proposals(api_response.raw_dao_data)
-    raw_reports = RawReports(
-        dataframe_filters.filter_top_shareholders(proposal_dataframes),
-        proposal_dataframes,
+def get_compression(
+    output_format: str, compression: str | None, compression_level: int | None
+) -> str:
+    compressions = (
+        export.PARQUET_COMPRESSIONS
+        if output_format == "parquet"
+        else export.CSV_COMPRESSIONS
     )
+    compression = compression or compressions[0]
+    if compression not in compressions:
+        raise click.BadParameter(
+            f"{compression} is not available for {output_format}",
+            param_hint="--compression",
+        )
+    if compression_level is not None and compression != "none":
+        if not pa.Codec.supports_compression_level(compression):
+            raise click.BadParameter(
+                f"{compression} has no compression levels",
+                param_hint="--compression_level",
+            )
+        minimum_level = pa.Codec.minimum_compression_level(compression)
+        maximum_level = pa.Codec.maximum_compression_level(compression)
+        if not minimum_level <= compression_level <= maximum_level:
+            raise click.BadParameter(
+                f"{compression} levels go from {minimum_level} to {maximum_level}",
+                param_hint="--compression_level",
+            )
 
-    return raw_reports
+    return compression
 
 
-def extract_dao_data(
-    number: int, name: str, use_tally: bool, blacklist: list[str]
-) -> DaoData:
-    raw_dao_data = []
-    export_file_name = ""
+def get_report_paths(file_name: str, output_format: str) -> list[str]:
+    report_path = f"./plutocracy_data/full_report/{file_name}_report"
+    if output_format == "parquet":
+        return [report_path, f"{report_path}_filtered"]
+    return [f"{report_path}.csv", f"{report_path}_filtered.csv"]
+
+
+def export_reports(
+    reports: Reports,
+    file_name: str,
+    output_format: str,
+    compression: str,
+    compression_level: int | None = None,
+):
+    export_report = (
+        export.organization_dataframes_to_parquet
+        if output_format == "parquet"
+        else export.organization_dataframes_to_csv
+    )
+    report_paths = get_report_paths(file_name, output_format)
+
+    with ThreadPoolExecutor(2) as executor:
+        exports = [
+            executor.submit(export_report, report, path, compression, compression_level)
+            for report, path in zip(
+                [reports.unfiltered, reports.filtered], report_paths
+            )
+        ]
+        for report_export in exports:
+            report_export.result()
+
+
+def export_whale_sensitivity(
+    report: ProposalTables,
+    quartiles: list[float],
+    file_name: str,
+    output_format: str,
+    compression: str,
+    compression_level: int | None = None,
+):
+    sensitivity = dataframe_filters.whale_sensitivity(report, quartiles)
+    sensitivity_path = f"./plutocracy_data/full_report/{file_name}_whale_sensitivity"
+    if output_format == "parquet":
+        export.whale_sensitivity_to_parquet(
+            sensitivity, sensitivity_path, compression, compression_level
+        )
+    else:
+        export.whale_sensitivity_to_csv(
+            sensitivity, sensitivity_path + ".csv", compression, compression_level
+        )
+
+
+def get_report_writer(
+    path: str, output_format: str, compression: str, compression_level: int | None
+) -> export.CsvWriter | export.ParquetDatasetWriter:
+    if output_format == "parquet":
+        return export.ParquetDatasetWriter(path, compression, compression_level)
+    return export.CsvWriter(path, compression, compression_level)
+
+
+def write_proposal_reports(
+    proposal_payload: dict,
+    unfiltered_writer: export.CsvWriter | export.ParquetDatasetWriter,
+    filtered_writer: export.CsvWriter | export.ParquetDatasetWriter,
+) -> bool:
+    proposal_tables = dataframes.create_tables_from(proposal_payload)
+    if proposal_tables.empty:
+        return False
+
+    unfiltered_writer.write_tables(proposal_tables)
+    filtered_writer.write_tables(
+        dataframe_filters.filter_top_shareholders_from_tables(proposal_tables)
+    )
+    return True
+
+
+async def stream_reports(
+    proposal_payloads: AsyncIterator[dict[str, dict]],
+    unfiltered_writer: export.CsvWriter | export.ParquetDatasetWriter,
+    filtered_writer: export.CsvWriter | export.ParquetDatasetWriter,
+) -> int:
+    number_of_proposals = 0
+    async for proposal_payload in proposal_payloads:
+        for proposal in proposal_payload.values():
+            # Transform and write off the event loop so extraction keeps going
+            if await to_thread(
+                write_proposal_reports, proposal, unfiltered_writer, filtered_writer
+            ):
+                number_of_proposals += 1
+    return number_of_proposals
+
+
+def report_retries():
+    retry_report = extract.get_retry_report()
+    if retry_report:
+        click.echo("API retries:")
+    for line in retry_report:
+        click.echo(f"\t{line}")
+
+
+def get_request(
+    number: int,
+    name: str,
+    use_tally: bool,
+    blacklist: list[str],
+    concurrency: int = 10,
+    dao_concurrency: int = 4,
+    use_cache: bool = True,
+    incremental: bool = False,
+    snapshot_rate: float = 1.0,
+) -> extract.Request:
     request = extract.Request(
-        150, proposal_limit=150, use_tally=use_tally, blacklist=blacklist
+        150,
+        proposal_limit=150,
+        use_tally=use_tally,
+        blacklist=blacklist,
+        concurrency=concurrency,
+        dao_concurrency=dao_concurrency,
+        use_cache=use_cache,
+        incremental=incremental,
+        snapshot_rate=snapshot_rate,
     )
     if name == "all":
         request.max_number_of_daos = number
-        raw_dao_data = asyncio_run(extract.dao_snapshot_data(request))
-        export_file_name = "plutocracy_tally" if use_tally else "plutocracy"
     else:
         request.dao_name = name
-        raw_dao_data = [asyncio_run(extract.dao_snapshot_data_for(request))]
-        export_file_name = name + "_tally" if use_tally else name
+    return request
+
+
+def get_export_file_name(name: str, use_tally: bool) -> str:
+    if name == "all":
+        return "plutocracy_tally" if use_tally else "plutocracy"
+    return name + "_tally" if use_tally else name
+
+
+def extract_dao_data(
+    number: int,
+    name: str,
+    use_tally: bool,
+    blacklist: list[str],
+    concurrency: int = 10,
+    dao_concurrency: int = 4,
+    use_cache: bool = True,
+    incremental: bool = False,
+    snapshot_rate: float = 1.0,
+) -> DaoData:
+    raw_dao_data = []
+    request = get_request(
+        number,
+        name,
+        use_tally,
+        blacklist,
+        concurrency,
+        dao_concurrency,
+        use_cache,
+        incremental,
+        snapshot_rate,
+    )
+    with extract.response_cache(request.use_cache), extract.extraction_state(
+        request.incremental
+    ), extract.rate_limits({"snapshot": request.snapshot_rate}):
+        if name == "all":
+            raw_dao_data = asyncio_run(
+                extract.with_pooled_sessions(extract.dao_snapshot_data(request))
+            )
+        else:
+            raw_dao_data = [
+                asyncio_run(
+                    extract.with_pooled_sessions(
+                        extract.dao_snapshot_data_for(request)
+                    )
+                )
+            ]
+    export_file_name = get_export_file_name(name, use_tally)
 
     if raw_dao_data == [{}] or not raw_dao_data:
         click.echo("ERROR: DAO(s) not found. Aborting...")
@@ -54,6 +250,41 @@ def extract_dao_data(
     return DaoData(export_file_name, raw_dao_data)
 
 
+def stream_dao_reports(
+    request: extract.Request,
+    file_name: str,
+    output_format: str,
+    compression: str,
+    compression_level: int | None = None,
+) -> int:
+    unfiltered_path, filtered_path = get_report_paths(file_name, output_format)
+    proposal_payloads = (
+        extract.stream_dao_snapshot_data_for(request)
+        if request.dao_name
+        else extract.stream_dao_snapshot_data(request)
+    )
+
+    print("Streaming reports...")
+    with extract.response_cache(request.use_cache), extract.extraction_state(
+        request.incremental
+    ), extract.rate_limits({"snapshot": request.snapshot_rate}), get_report_writer(
+        unfiltered_path, output_format, compression, compression_level
+    ) as unfiltered_writer, get_report_writer(
+        filtered_path, output_format, compression, compression_level
+    ) as filtered_writer:
+        number_of_proposals = asyncio_run(
+            extract.with_pooled_sessions(
+                stream_reports(proposal_payloads, unfiltered_writer, filtered_writer)
+            )
+        )
+
+    if not number_of_proposals:
+        click.echo("ERROR: DAO(s) not found. Aborting...")
+    else:
+        print(f"Done, {number_of_proposals} proposals written")
+    return number_of_proposals
+
+
 @click.command()
 @click.option(
     "-n",
@@ -77,21 +308,144 @@ def extract_dao_data(
     type=Blacklist(),
     help=help["blacklist"],
 )
-def run(number: int, name: str, use_tally: bool, blacklist: list[str]):
+@click.option(
+    "-c",
+    "--concurrency",
+    default=10,
+    show_default=True,
+    type=click.IntRange(1, 100),
+    help=help["concurrency"],
+)
+@click.option(
+    "--dao_concurrency",
+    default=4,
+    show_default=True,
+    type=click.IntRange(1, 60),
+    help=help["dao_concurrency"],
+)
+@click.option(
+    "--snapshot_rate",
+    default=1.0,
+    show_default=True,
+    type=click.FloatRange(0, min_open=True),
+    help=help["snapshot_rate"],
+)
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    default=True,
+    show_default=True,
+    help=help["cache"],
+)
+@click.option(
+    "-i", "--incremental", default=False, is_flag=True, help=help["incremental"]
+)
+@click.option("-s", "--stream", default=False, is_flag=True, help=help["stream"])
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="csv",
+    show_default=True,
+    type=click.Choice(["csv", "parquet"]),
+    help=help["format"],
+)
+@click.option(
+    "--compression",
+    type=click.Choice(
+        list(dict.fromkeys(export.CSV_COMPRESSIONS + export.PARQUET_COMPRESSIONS))
+    ),
+    help=help["compression"],
+)
+@click.option(
+    "--compression_level",
+    type=int,
+    help=help["compression_level"],
+)
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help=help["workers"],
+)
+@click.option(
+    "--whale_quartile",
+    "whale_quartiles",
+    multiple=True,
+    type=click.FloatRange(0, 1, min_open=True, max_open=True),
+    help=help["whale_quartile"],
+)
+def run(
+    number: int,
+    name: str,
+    use_tally: bool,
+    blacklist: list[str],
+    concurrency: int,
+    dao_concurrency: int,
+    snapshot_rate: float,
+    use_cache: bool,
+    incremental: bool,
+    stream: bool,
+    output_format: str,
+    compression: str | None,
+    compression_level: int | None,
+    workers: int,
+    whale_quartiles: tuple[float],
+):
     if not blacklist:
         blacklist = []
-    api_response = extract_dao_data(number, name, use_tally, blacklist)
+    compression = get_compression(output_format, compression, compression_level)
+    if stream and whale_quartiles:
+        raise click.UsageError("--whale_quartile is not available with --stream")
+    if stream:
+        stream_dao_reports(
+            get_request(
+                number,
+                name,
+                use_tally,
+                blacklist,
+                concurrency,
+                dao_concurrency,
+                use_cache,
+                incremental,
+                snapshot_rate,
+            ),
+            get_export_file_name(name, use_tally),
+            output_format,
+            compression,
+            compression_level,
+        )
+        report_retries()
+        return
+
+    api_response = extract_dao_data(
+        number,
+        name,
+        use_tally,
+        blacklist,
+        concurrency,
+        dao_concurrency,
+        use_cache,
+        incremental,
+        snapshot_rate,
+    )
+    report_retries()
     if not api_response:
         return
 
-    raw_reports = get_raw_reports(api_response)
-    reports = get_reports(raw_reports)
+    reports = get_reports(api_response, workers)
 
-    export.organization_dataframes_to_csv(
-        reports.unfiltered,
-        f"./plutocracy_data/full_report/{api_response.file_name}_report.csv",
-    )
-    export.organization_dataframes_to_csv(
-        reports.filtered,
-        f"./plutocracy_data/full_report/{api_response.file_name}_report_filtered.csv",
+    export_reports(
+        reports, api_response.file_name, output_format, compression, compression_level
     )
+    if whale_quartiles:
+        export_whale_sensitivity(
+            reports.unfiltered,
+            sorted(set(whale_quartiles)),
+            api_response.file_name,
+            output_format,
+            compression,
+            compression_level,
+        )
@@ -1,8 +1,24 @@
 import pandas as pd
 
 
-def get_quartile_by_vp(snapshot_df: pd.DataFrame, quartile: float) -> pd.DataFrame:
+def get_whale_mask(snapshot_df: pd.DataFrame, quartile: float) -> pd.Series:
     assert quartile > 0 and quartile < 1, "Quartile must be a value in range (0, 1)"
 
-    quartile_value = snapshot_df["vp"].quantile(quartile)
-    return snapshot_df[snapshot_df["vp"] >= quartile_value]
+    proposal_ids = snapshot_df["proposal_id"]
+    quartile_values = snapshot_df.groupby(proposal_ids, observed=True, sort=False)[
+        "vp"
+    ].quantile(quartile)
+    thresholds = quartile_values.to_numpy()[
+        quartile_values.index.get_indexer(proposal_ids)
+    ]
+    above_quartile = pd.Series(
+        snapshot_df["vp"].to_numpy() >= thresholds, index=snapshot_df.index
+    )
+    # A voter is a whale of a proposal if any of their votes on it is
+    return above_quartile.groupby(
+        [proposal_ids, snapshot_df["voter"]], observed=True, sort=False
+    ).transform("any")
+
+
+def get_quartile_by_vp(snapshot_df: pd.DataFrame, quartile: float) -> pd.DataFrame:
+    return snapshot_df[get_whale_mask(snapshot_df, quartile)]
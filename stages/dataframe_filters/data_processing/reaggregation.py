@@ -1,68 +1,120 @@
-from copy import deepcopy
+from itertools import chain
 
+import numpy as np
 import pandas as pd
 
 
-def get_whales(
-    unfiltered_proposal: pd.DataFrame, top_shareholders: pd.Series
-) -> pd.DataFrame:
-    return unfiltered_proposal.loc[
-        lambda df: [voter in top_shareholders.values for voter in df["voter"]]
+ChoiceEntries = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def get_single_choice_entries(choices: pd.Series) -> ChoiceEntries:
+    if choices.dtype.kind in "iu":
+        choice_indices = choices.to_numpy() - 1
+    else:
+        choice_indices = (
+            np.fromiter(
+                (
+                    list(choice.values())[0] if type(choice) is dict else choice
+                    for choice in choices
+                ),
+                dtype=np.int64,
+                count=len(choices),
+            )
+            - 1
+        )
+    rows = np.arange(len(choices))
+    return rows, choice_indices, np.ones(len(choices))
+
+
+def get_approval_entries(choices: pd.Series) -> ChoiceEntries:
+    lengths = np.fromiter(map(len, choices), dtype=np.int64, count=len(choices))
+    rows = np.repeat(np.arange(len(choices)), lengths)
+    choice_indices = (
+        np.fromiter(chain.from_iterable(choices), dtype=np.int64, count=lengths.sum())
+        - 1
+    )
+    return rows, choice_indices, np.ones(len(rows))
+
+
+def get_weighted_entries(choices: pd.Series) -> ChoiceEntries:
+    lengths = np.fromiter(map(len, choices), dtype=np.int64, count=len(choices))
+    rows = np.repeat(np.arange(len(choices)), lengths)
+    choice_indices = (
+        np.fromiter(
+            map(int, chain.from_iterable(choices)), dtype=np.int64, count=len(rows)
+        )
+        - 1
+    )
+    weights = np.fromiter(
+        chain.from_iterable(choice.values() for choice in choices),
+        dtype=np.float64,
+        count=len(rows),
+    )
+    weight_totals = np.bincount(rows, weights, minlength=len(choices))[rows]
+    return (
+        rows,
+        choice_indices,
+        np.divide(
+            weights, weight_totals, out=np.zeros(len(rows)), where=weight_totals != 0
+        ),
+    )
+
+
+CHOICE_DECODERS = {
+    "single-choice": get_single_choice_entries,
+    "basic": get_single_choice_entries,
+    "approval": get_approval_entries,
+    "weighted": get_weighted_entries,
+}
+
+
+def get_choice_matrix(
+    choices: pd.Series, proposal_type: str, number_of_choices: int
+) -> np.ndarray:
+    # One row per vote and one column per choice, holding the share of the
+    # vote's voting power that went to that choice
+    rows, choice_indices, weights = CHOICE_DECODERS[proposal_type](choices)
+    choice_matrix = np.zeros((len(choices), number_of_choices))
+    np.add.at(choice_matrix, (rows, choice_indices), weights)
+    return choice_matrix
+
+
+def get_removed_scores(
+    whales: pd.DataFrame, proposals: pd.DataFrame
+) -> tuple[np.ndarray, np.ndarray]:
+    # Whale voting power per proposal and choice, and which choices whales voted for
+    number_of_choices = max(map(len, proposals["proposal_scores"]), default=0)
+    removed_scores = np.zeros((len(proposals), number_of_choices))
+    voted_choices = np.zeros((len(proposals), number_of_choices), dtype=bool)
+
+    assert (
+        proposals.index.is_unique
+    ), "Proposals must be unique, merge them with into_single_tables"
+    proposal_positions = proposals.index.get_indexer(whales["proposal_id"])
+    proposal_types = proposals["proposal_type"].to_numpy()[proposal_positions]
+    for proposal_type in pd.unique(proposal_types):
+        type_mask = proposal_types == proposal_type
+        type_whales = whales[type_mask]
+        choice_matrix = get_choice_matrix(
+            type_whales["choice"], proposal_type, number_of_choices
+        )
+        np.add.at(
+            removed_scores,
+            proposal_positions[type_mask],
+            type_whales["vp"].to_numpy(float)[:, np.newaxis] * choice_matrix,
+        )
+        np.logical_or.at(
+            voted_choices, proposal_positions[type_mask], choice_matrix != 0
+        )
+
+    return removed_scores, voted_choices
+
+
+def reaggregate_scores(
+    scores: list[float | int], removed_scores: list[float], voted_choices: list[bool]
+) -> list[float | int]:
+    # Choices no whale voted for keep their original value and type
+    return [
+        score - removed_score if voted else score
+        for score, removed_score, voted in zip(scores, removed_scores, voted_choices)
     ]
-
-
-def reaggregate_votes_single_choice_or_basic(
-    unfiltered_proposal: pd.DataFrame, top_shareholders: pd.Series
-) -> pd.DataFrame | None:
-    whales: pd.DataFrame = get_whales(unfiltered_proposal, top_shareholders)
-    scores: list[float | int] = deepcopy(unfiltered_proposal["proposal_scores"].iloc[0])
-    n_rows = unfiltered_proposal.shape[0]
-
-    for _, whale in whales.iterrows():
-        if type(whale["choice"]) is dict:
-            whale["choice"] = list(whale["choice"].values())[0]
-
-        scores[whale["choice"] - 1] -= whale["vp"]
-    unfiltered_proposal["proposal_scores"] = [scores] * n_rows
-
-    return unfiltered_proposal
-
-
-def reaggregate_votes_approval(
-    unfiltered_proposal: pd.DataFrame, top_shareholders: pd.Series
-) -> pd.DataFrame:
-    whales: pd.DataFrame = get_whales(unfiltered_proposal, top_shareholders)
-    scores: list[float | int] = deepcopy(unfiltered_proposal["proposal_scores"].iloc[0])
-    n_rows = unfiltered_proposal.shape[0]
-
-    for _, whale in whales.iterrows():
-        choices: list[int] = whale["choice"]
-        for choice in choices:
-            scores[choice - 1] -= whale["vp"]
-    unfiltered_proposal["proposal_scores"] = [scores] * n_rows
-
-    return unfiltered_proposal
-
-
-def reaggregate_votes_weighted(
-    unfiltered_proposal: pd.DataFrame, top_shareholders: pd.Series
-) -> pd.DataFrame:
-    whales: pd.DataFrame = get_whales(unfiltered_proposal, top_shareholders)
-    n_rows = unfiltered_proposal.shape[0]
-    scores: list[int | float] = deepcopy(unfiltered_proposal["proposal_scores"].iloc[0])
-
-    for _, whale in whales.iterrows():
-        weights: list[int | float] = whale["choice"].values()
-        weight_total = sum(weights)
-        weight_values: list[float] = [
-            (weight / weight_total) * whale["vp"] for weight in weights
-        ]
-        new_scores = {
-            int(whale_choice): scores[int(whale_choice) - 1] - weight
-            for whale_choice, weight in zip(whale["choice"].keys(), weight_values)
-        }
-        for choice in new_scores.keys():
-            scores[choice - 1] = new_scores[choice]
-    unfiltered_proposal["proposal_scores"] = [scores] * n_rows
-
-    return unfiltered_proposal
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from .reaggregation import CHOICE_DECODERS
+
+
+def get_vote_ranks(
+    vp: np.ndarray, proposal_positions: np.ndarray, number_of_proposals: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Sort the votes of each proposal by descending voting power, so the
+    # whales of every quantile are a prefix of their proposal's votes
+    order = np.lexsort((-vp, proposal_positions))
+    vote_counts = np.bincount(proposal_positions, minlength=number_of_proposals)
+    offsets = np.cumsum(vote_counts) - vote_counts
+
+    ranks = np.empty(len(vp), dtype=np.int64)
+    ranks[order] = np.arange(len(vp)) - offsets[proposal_positions[order]]
+    return order, ranks
+
+
+def get_choice_entries(
+    votes: pd.DataFrame, proposal_types: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rows, choice_indices, weights = [], [], []
+    for proposal_type in pd.unique(proposal_types):
+        type_rows = np.flatnonzero(proposal_types == proposal_type)
+        entry_rows, entry_choice_indices, entry_weights = CHOICE_DECODERS[
+            proposal_type
+        ](votes["choice"].iloc[type_rows])
+        rows.append(type_rows[entry_rows])
+        choice_indices.append(entry_choice_indices)
+        weights.append(entry_weights)
+
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    return np.concatenate(rows), np.concatenate(choice_indices), np.concatenate(weights)
+
+
+def get_removed_score_sums(
+    ranks: np.ndarray,
+    group_ids: np.ndarray,
+    values: np.ndarray,
+    whale_counts: np.ndarray,
+    number_of_groups: int,
+) -> np.ndarray:
+    # Running totals of each group in rank order; the removed score of a
+    # group is its running total at the last whale
+    order = np.lexsort((ranks, group_ids))
+    sorted_group_ids = group_ids[order]
+    running_totals = pd.Series(values[order]).groupby(sorted_group_ids).cumsum()
+
+    keys = sorted_group_ids * (ranks.max(initial=0) + 1) + ranks[order]
+    group_starts = np.searchsorted(sorted_group_ids, np.arange(number_of_groups))
+    whale_ends = np.searchsorted(
+        keys,
+        np.arange(number_of_groups)[:, np.newaxis] * (ranks.max(initial=0) + 1)
+        + whale_counts,
+    )
+    return np.where(
+        whale_ends > group_starts[:, np.newaxis],
+        np.append(running_totals.to_numpy(), 0)[whale_ends - 1],
+        0,
+    )
+
+
+def get_winning_choices(scores: np.ndarray, number_of_choices: np.ndarray):
+    winning_choices = pd.array(scores.argmax(axis=1) + 1, dtype="Int64")
+    winning_choices[number_of_choices == 0] = pd.NA
+    return winning_choices
+
+
+def get_whale_sensitivity(
+    votes: pd.DataFrame, proposals: pd.DataFrame, quartiles: list[float]
+) -> pd.DataFrame:
+    assert all(
+        0 < quartile < 1 for quartile in quartiles
+    ), "Quartiles must be values in range (0, 1)"
+
+    number_of_proposals = len(proposals)
+    assert (
+        proposals.index.is_unique
+    ), "Proposals must be unique, merge them with into_single_tables"
+    proposal_positions = proposals.index.get_indexer(votes["proposal_id"])
+    vp = votes["vp"].to_numpy(float)
+    order, ranks = get_vote_ranks(vp, proposal_positions, number_of_proposals)
+
+    quartile_values = (
+        votes.groupby(votes["proposal_id"], observed=True, sort=False)["vp"]
+        .quantile(quartiles)
+        .unstack()
+        .reindex(index=proposals.index, columns=quartiles)
+        .to_numpy()
+    )
+    whale_counts = np.stack(
+        [
+            np.bincount(
+                proposal_positions,
+                vp >= quartile_values[proposal_positions, quartile_index],
+                minlength=number_of_proposals,
+            ).astype(np.int64)
+            for quartile_index in range(len(quartiles))
+        ],
+        axis=1,
+    )
+
+    sorted_positions = proposal_positions[order]
+    running_vp = pd.Series(vp[order]).groupby(sorted_positions).cumsum().to_numpy()
+    vote_counts = np.bincount(proposal_positions, minlength=number_of_proposals)
+    offsets = np.cumsum(vote_counts) - vote_counts
+    whale_vp = np.where(
+        whale_counts > 0,
+        np.append(running_vp, 0)[offsets[:, np.newaxis] + whale_counts - 1],
+        0,
+    )
+    total_vp = np.bincount(proposal_positions, vp, minlength=number_of_proposals)
+
+    proposal_scores = list(proposals["proposal_scores"])
+    number_of_choices = np.fromiter(
+        map(len, proposal_scores), dtype=np.int64, count=number_of_proposals
+    )
+    max_choices = number_of_choices.max(initial=0)
+    scores = np.full((number_of_proposals, max_choices), -np.inf)
+    for position, proposal_score in enumerate(proposal_scores):
+        scores[position, : len(proposal_score)] = proposal_score
+
+    rows, choice_indices, weights = get_choice_entries(
+        votes, proposals["proposal_type"].to_numpy()[proposal_positions]
+    )
+    group_ids = proposal_positions[rows] * max_choices + choice_indices
+    # Each (proposal, choice) group is cut at its proposal's whale count
+    removed_scores = get_removed_score_sums(
+        ranks[rows],
+        group_ids,
+        weights * vp[rows],
+        np.repeat(whale_counts, max_choices, axis=0),
+        number_of_proposals * max_choices,
+    ).reshape(number_of_proposals, max_choices, len(quartiles))
+
+    # One row per proposal and quartile, in proposal order
+    filtered_scores = (
+        (scores[:, :, np.newaxis] - removed_scores)
+        .transpose(0, 2, 1)
+        .reshape(-1, max_choices)
+    )
+    repeated_number_of_choices = np.repeat(number_of_choices, len(quartiles))
+    winning_choices = get_winning_choices(
+        np.repeat(scores, len(quartiles), axis=0), repeated_number_of_choices
+    )
+    filtered_winning_choices = get_winning_choices(
+        filtered_scores, repeated_number_of_choices
+    )
+    repeated_total_vp = np.repeat(total_vp, len(quartiles))
+
+    return pd.DataFrame(
+        {
+            "proposal_organization_name": np.repeat(
+                proposals["proposal_organization_name"].to_numpy(), len(quartiles)
+            ),
+            "number_of_voters": np.repeat(vote_counts, len(quartiles)),
+            "number_of_whales": whale_counts.reshape(-1),
+            "whale_vp": whale_vp.reshape(-1),
+            "whale_vp_share": whale_vp.reshape(-1)
+            / np.where(repeated_total_vp == 0, np.nan, repeated_total_vp),
+            "winning_choice": winning_choices,
+            "filtered_winning_choice": filtered_winning_choices,
+            "winner_flipped": (winning_choices != filtered_winning_choices)
+            .fillna(False)
+            .to_numpy(bool),
+            "filtered_scores": [
+                proposal_filtered_scores[:choices].tolist()
+                for proposal_filtered_scores, choices in zip(
+                    filtered_scores, repeated_number_of_choices
+                )
+            ],
+        },
+        index=pd.MultiIndex.from_product(
+            [proposals.index, quartiles], names=["proposal_id", "quartile"]
+        ),
+    )
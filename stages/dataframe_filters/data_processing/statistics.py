@@ -1,87 +1,273 @@
+from ast import literal_eval
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 
+from ...datatypes import ProposalTables
 
-def get_number_of_voters_per_proposal(
-    dao_proposals: dict[str, pd.Series]
-) -> dict[str, pd.DataFrame]:
-    voters = {}
 
-    for organization in dao_proposals.keys():
-        all_proposals = dao_proposals[organization]
-        voter_turnout: pd.Series[int] = all_proposals.groupby("proposal_id")[
-            "voter"
-        ].size()
+PROPOSAL_KEYS = ["proposal_organization_name", "proposal_id"]
+PROPOSAL_COLUMNS = [
+    "proposal_title",
+    "proposal_start",
+    "proposal_end",
+    "proposal_scores_total",
+    "proposal_type",
+    "proposal_scores",
+    "proposal_choices",
+]
 
-        voters[organization] = voter_turnout
 
-    return voters
+def get_lists(values: pd.Series) -> list[list]:
+    # Reports read back from CSV hold the reprs of the lists
+    return [
+        literal_eval(value) if isinstance(value, str) else list(value)
+        for value in values
+    ]
 
 
-def get_number_of_whales_to_all_voters_ratio(
-    dao_proposals: dict[str, pd.DataFrame],
-    dao_proposals_filtered: dict[str, pd.DataFrame],
-) -> list[dict[str, int]]:
-    ratios = []
-    for organization in dao_proposals.keys():
-        all_proposals = dao_proposals[organization]
-        try:
-            all_proposals_filtered = dao_proposals_filtered[organization]
-        except KeyError:
-            continue
-        tally = {organization: [0, 0]}
+def get_flat_values(lists: list[list], dtype=np.float64) -> tuple[np.ndarray, ...]:
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    offsets = np.cumsum(lengths) - lengths
+    values = np.fromiter(chain.from_iterable(lists), dtype=dtype, count=lengths.sum())
+    return values, lengths, offsets
 
-        num_of_voters = all_proposals["voter"].unique().shape[0]
-        num_of_voters_filtered = all_proposals_filtered["voter"].unique().shape[0]
-        tally[organization][0] = num_of_voters - num_of_voters_filtered
-        tally[organization][1] = num_of_voters
-        ratios.append(tally)
 
-    return ratios
+def get_score_matrix(scores: list[list]) -> tuple[np.ndarray, np.ndarray]:
+    values, lengths, offsets = get_flat_values(scores)
+    rows = np.repeat(np.arange(len(scores)), lengths)
+    columns = np.arange(len(values)) - offsets[rows]
 
+    score_matrix = np.full((len(scores), lengths.max(initial=0)), -np.inf)
+    score_matrix[rows, columns] = values
+    return score_matrix, lengths
 
-def get_all_proposals(
-    dao_proposals: dict[str, pd.DataFrame],
-    dao_proposals_filtered: dict[str, pd.DataFrame],
-    organization: str,
-) -> tuple[dict[str, pd.DataFrame], dict[str, pd.DataFrame]] | None:
-    all_proposals = {
-        proposal_df.iloc[0]["proposal_id"]: proposal_df
-        for _, proposal_df in dao_proposals[organization].groupby(
-            "proposal_id", sort=False
+
+def get_winning_indexes(score_matrix: np.ndarray) -> np.ndarray:
+    if not score_matrix.size:
+        return np.zeros(len(score_matrix), dtype=np.int64)
+    return score_matrix.argmax(axis=1)
+
+
+def get_choices_at(choices: list[list], choice_indexes: np.ndarray) -> np.ndarray:
+    choice_values, number_of_choices, choice_offsets = get_flat_values(choices, object)
+    in_range = choice_indexes < number_of_choices
+    return np.append(choice_values, None)[
+        np.where(in_range, choice_offsets + choice_indexes, len(choice_values))
+    ]
+
+
+def get_proposals_from(report: pd.DataFrame | ProposalTables) -> pd.DataFrame:
+    if isinstance(report, ProposalTables):
+        return report.proposals.reset_index().set_index(PROPOSAL_KEYS)
+    return report.loc[
+        ~report.duplicated(PROPOSAL_KEYS), PROPOSAL_KEYS + PROPOSAL_COLUMNS
+    ].set_index(PROPOSAL_KEYS)
+
+
+def get_votes_from(report: pd.DataFrame | ProposalTables) -> pd.DataFrame:
+    if isinstance(report, ProposalTables):
+        return report.votes.assign(
+            proposal_organization_name=report.get_proposal_rows(
+                ["proposal_organization_name"]
+            )["proposal_organization_name"]
         )
-    }
-    try:
-        all_proposals_filtered = {
-            proposal_df.iloc[0]["proposal_id"]: proposal_df
-            for _, proposal_df in dao_proposals_filtered[organization].groupby(
-                "proposal_id", sort=False
-            )
+    return report
+
+
+def get_voter_counts(report: pd.DataFrame | ProposalTables) -> pd.Series:
+    votes = get_votes_from(report)
+    return votes.groupby(
+        [votes[key] for key in PROPOSAL_KEYS], observed=True, sort=False
+    ).size()
+
+
+def compare_proposals(
+    proposals: pd.DataFrame, filtered_proposals: pd.DataFrame
+) -> pd.DataFrame:
+    proposals = proposals.reindex(filtered_proposals.index)
+    proposals = proposals[proposals["proposal_scores"].notna()]
+    filtered_proposals = filtered_proposals.loc[proposals.index]
+
+    score_matrix, number_of_scores = get_score_matrix(
+        get_lists(proposals["proposal_scores"])
+    )
+    filtered_score_matrix, number_of_filtered_scores = get_score_matrix(
+        get_lists(filtered_proposals["proposal_scores"])
+    )
+    # Like zip, only compare the choices both score lists have
+    number_of_differences = np.minimum(number_of_scores, number_of_filtered_scores)
+    width = number_of_differences.max(initial=0)
+    with np.errstate(invalid="ignore"):
+        difference_matrix = np.where(
+            np.arange(width) < number_of_differences[:, np.newaxis],
+            score_matrix[:, :width] - filtered_score_matrix[:, :width],
+            0.0,
+        )
+
+    # Approval votes count towards every choice they approve, so only the
+    # first choice's difference is the whales' voting power
+    whale_voting_power = np.where(
+        (proposals["proposal_type"] == "approval").to_numpy(),
+        difference_matrix[:, 0] if width else 0.0,
+        difference_matrix.sum(axis=1),
+    )
+    total_voting_power = np.trunc(proposals["proposal_scores_total"].to_numpy(float))
+    winning_choice_indexes = get_winning_indexes(score_matrix)
+    filtered_winning_choice_indexes = get_winning_indexes(filtered_score_matrix)
+    choices = get_lists(proposals["proposal_choices"])
+
+    proposal_statistics = pd.DataFrame(
+        {
+            "proposal_title": proposals["proposal_title"],
+            "proposal_start": proposals["proposal_start"],
+            "proposal_end": proposals["proposal_end"],
+            "score_differences": [
+                proposal_differences[:length]
+                for proposal_differences, length in zip(
+                    difference_matrix.tolist(), number_of_differences
+                )
+            ],
+            "whale_vp_proportion": whale_voting_power
+            / np.where(total_voting_power == 0, np.nan, total_voting_power),
+            "total_vp": total_voting_power,
+            "outcome_changed": winning_choice_indexes
+            != filtered_winning_choice_indexes,
+            "outcome_old": get_choices_at(choices, winning_choice_indexes),
+            "outcome_new": get_choices_at(choices, filtered_winning_choice_indexes),
+        },
+        index=proposals.index,
+    )
+    # Proposals without any voting power have no whale proportion
+    return proposal_statistics[total_voting_power != 0]
+
+
+def get_proposal_statistics(
+    report: pd.DataFrame | ProposalTables,
+    filtered_report: pd.DataFrame | ProposalTables,
+) -> pd.DataFrame:
+    proposal_statistics = compare_proposals(
+        get_proposals_from(report), get_proposals_from(filtered_report)
+    )
+    proposal_statistics["voter_count"] = get_voter_counts(report).reindex(
+        proposal_statistics.index
+    )
+    return proposal_statistics
+
+
+def get_voter_totals(
+    report: pd.DataFrame | ProposalTables,
+    filtered_report: pd.DataFrame | ProposalTables,
+) -> pd.DataFrame:
+    number_of_voters, number_of_filtered_voters = [
+        votes.groupby("proposal_organization_name", observed=True, sort=False)[
+            "voter"
+        ].nunique()
+        for votes in [get_votes_from(report), get_votes_from(filtered_report)]
+    ]
+    return pd.DataFrame(
+        {
+            "number_of_whales": number_of_voters
+            - number_of_filtered_voters.reindex(number_of_voters.index, fill_value=0),
+            "number_of_voters": number_of_voters,
         }
-    except KeyError:
-        return None
-    return all_proposals, all_proposals_filtered
+    )
+
 
+def get_organization_statistics(
+    report: pd.DataFrame | ProposalTables,
+    filtered_report: pd.DataFrame | ProposalTables,
+    proposal_statistics: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    if proposal_statistics is None:
+        proposal_statistics = get_proposal_statistics(report, filtered_report)
 
-def get_winning_choice_indexes(
-    proposal_scores: list, proposal_scores_filtered: list
-) -> tuple[int, int]:
-    unfiltered_winning_choice_index = proposal_scores.index(max(proposal_scores))
-    filtered_winning_choice_index = proposal_scores_filtered.index(
-        max(proposal_scores_filtered)
+    organization_statistics = get_voter_totals(report, filtered_report)
+    organization_statistics["whale_pivotality"] = (
+        proposal_statistics.groupby(
+            level="proposal_organization_name", observed=True, sort=False
+        )["outcome_changed"]
+        .mean()
+        .reindex(organization_statistics.index, fill_value=0.0)
     )
+    return organization_statistics
 
-    return unfiltered_winning_choice_index, filtered_winning_choice_index
+
+def concat_organizations(
+    dao_proposals: dict[str, pd.DataFrame],
+    organizations: list[str],
+    columns: list[str],
+    first_rows: bool = False,
+) -> pd.DataFrame:
+    frames = [
+        dao_proposals[organization].loc[
+            (
+                ~dao_proposals[organization].duplicated("proposal_id")
+                if first_rows
+                else slice(None)
+            ),
+            columns,
+        ]
+        for organization in organizations
+    ]
+    organization_proposals = pd.concat(frames, ignore_index=True)
+    organization_proposals["proposal_organization_name"] = np.repeat(
+        organizations, list(map(len, frames))
+    )
+    return organization_proposals
 
 
-def get_score_differences(
-    proposal_scores: list, proposal_scores_filtered: list
-) -> list:
+def get_common_organizations(
+    dao_proposals: dict[str, pd.DataFrame],
+    dao_proposals_filtered: dict[str, pd.DataFrame],
+) -> list[str]:
     return [
-        score - score_filtered
-        for score, score_filtered in zip(
-            proposal_scores,
-            proposal_scores_filtered,
+        organization
+        for organization in dao_proposals.keys()
+        if organization in dao_proposals_filtered
+    ]
+
+
+def get_number_of_voters_per_proposal(
+    dao_proposals: dict[str, pd.Series],
+) -> dict[str, pd.DataFrame]:
+    if not dao_proposals:
+        return {}
+
+    voter_counts = get_voter_counts(
+        concat_organizations(dao_proposals, list(dao_proposals.keys()), ["proposal_id"])
+    )
+    # Organizations without any votes get no group of their own
+    organization_voter_counts = {
+        organization: proposal_voter_counts.droplevel(0)
+        for organization, proposal_voter_counts in voter_counts.groupby(
+            level=0, sort=False
         )
+    }
+    return {
+        organization: organization_voter_counts.get(
+            organization, voter_counts.iloc[:0].droplevel(0)
+        ).sort_index()
+        for organization in dao_proposals.keys()
+    }
+
+
+def get_number_of_whales_to_all_voters_ratio(
+    dao_proposals: dict[str, pd.DataFrame],
+    dao_proposals_filtered: dict[str, pd.DataFrame],
+) -> list[dict[str, int]]:
+    organizations = get_common_organizations(dao_proposals, dao_proposals_filtered)
+    if not organizations:
+        return []
+
+    voter_totals = get_voter_totals(
+        concat_organizations(dao_proposals, organizations, ["voter"]),
+        concat_organizations(dao_proposals_filtered, organizations, ["voter"]),
+    ).reindex(organizations, fill_value=0)
+    return [
+        {organization: list(map(int, voter_totals.loc[organization]))}
+        for organization in organizations
     ]
 
 
@@ -89,63 +275,37 @@ def get_score_comparisons(
     dao_proposals: dict[str, pd.DataFrame],
     dao_proposals_filtered: dict[str, pd.DataFrame],
 ) -> list[dict[str, dict]]:
-    differences: list[dict[str, dict]] = []
-    for organization in dao_proposals.keys():
-        differences.append({organization: dict()})
-        organization_proposals = differences[-1][organization]
-        maybe_proposals = get_all_proposals(
-            dao_proposals, dao_proposals_filtered, organization
-        )
-        if not maybe_proposals:
-            continue
-        all_proposals, all_proposals_filtered = maybe_proposals
-
-        for proposal_id in all_proposals_filtered.keys():
-            proposal_filtered_df = all_proposals_filtered[proposal_id]
-            try:
-                proposal_df = all_proposals[proposal_id]
-            except KeyError:
-                print(
-                    f"issue w/ {proposal_filtered_df.iloc[0]['proposal_organization_name']} on {proposal_filtered_df.iloc[0]['proposal_id']}"
-                )
-                continue
-
-            first_row = proposal_df.iloc[0]
-            proposal_scores = eval(first_row["proposal_scores"])
-            proposal_scores_filtered = eval(
-                proposal_filtered_df.iloc[0]["proposal_scores"]
-            )
-
-            (
-                unfiltered_winning_choice_index,
-                filtered_winning_choice_index,
-            ) = get_winning_choice_indexes(proposal_scores, proposal_scores_filtered)
+    differences: list[dict[str, dict]] = [
+        {organization: dict()} for organization in dao_proposals.keys()
+    ]
+    organizations = get_common_organizations(dao_proposals, dao_proposals_filtered)
+    if not organizations:
+        return differences
 
-            choices = eval(first_row["proposal_choices"])
-            score_differences = get_score_differences(
-                proposal_scores, proposal_scores_filtered
+    columns = ["proposal_id"] + PROPOSAL_COLUMNS
+    proposal_statistics = compare_proposals(
+        *[
+            get_proposals_from(
+                concat_organizations(proposals, organizations, columns, True)
             )
-            total_voting_power = int(first_row["proposal_scores_total"])
-            if first_row["proposal_type"] == "approval":
-                whale_voting_power = score_differences[0]
-            else:
-                whale_voting_power = sum(score_differences)
-
-            try:
-                whale_vp_proportion = whale_voting_power / total_voting_power
-            except ZeroDivisionError:
+            for proposals in [dao_proposals, dao_proposals_filtered]
+        ]
+    )
+    for organization_differences in differences:
+        for organization, organization_proposals in organization_differences.items():
+            if organization not in proposal_statistics.index:
                 continue
-
-            organization_proposals[first_row["proposal_id"]] = [
-                first_row["proposal_id"],
-                first_row["proposal_title"],
-                first_row["proposal_start"],
-                first_row["proposal_end"],
-                score_differences,
-                whale_vp_proportion,
-                total_voting_power,
-                not unfiltered_winning_choice_index == filtered_winning_choice_index,
-                choices[unfiltered_winning_choice_index],
-                choices[filtered_winning_choice_index],
-            ]
+            for row in proposal_statistics.loc[organization].itertuples():
+                organization_proposals[row.Index] = [
+                    row.Index,
+                    row.proposal_title,
+                    row.proposal_start,
+                    row.proposal_end,
+                    row.score_differences,
+                    row.whale_vp_proportion,
+                    int(row.total_vp),
+                    bool(row.outcome_changed),
+                    row.outcome_old,
+                    row.outcome_new,
+                ]
     return differences
@@ -0,0 +1,77 @@
+import pandas as pd
+
+from stages import dataframe_filters, dataframes, merge
+from stages.dataframe_filters.data_processing.filters import get_whale_mask
+from stages.tests.constants import dao_snapshot_data
+
+
+def get_tables(proposal_id: str):
+    for dao in dao_snapshot_data:
+        if proposal_id in dao:
+            return dataframes.create_tables_from(dao[proposal_id])
+
+
+def test_get_whale_mask_selects_votes_at_or_above_quantile():
+    votes = get_tables("0xweighted").votes
+    whale_mask = get_whale_mask(votes, 0.95)
+
+    assert list(votes.loc[whale_mask, "vp"]) == sorted(votes["vp"])[-2:]
+
+
+def test_get_whale_mask_matches_voter_addresses():
+    votes = pd.DataFrame(
+        {
+            "proposal_id": ["0x1"] * 4,
+            "voter": ["0xa", "0xb", "0xa", "0xc"],
+            "vp": [100.0, 1.0, 2.0, 3.0],
+        },
+        index=pd.Index(["0xa", "0xb", "0xa", "0xc"], name="Voter Address"),
+    )
+
+    assert list(get_whale_mask(votes, 0.9)) == [True, False, True, False]
+
+
+def test_filter_top_shareholders_removes_whales_and_their_scores():
+    proposal_tables = get_tables("0xsingle")
+    filtered_tables = dataframe_filters.filter_top_shareholders_from_tables(
+        proposal_tables
+    )
+    whale_mask = get_whale_mask(proposal_tables.votes, 0.95)
+    whales = proposal_tables.votes[whale_mask]
+
+    assert filtered_tables.votes.equals(proposal_tables.votes[~whale_mask])
+    assert not whales.empty
+    scores = list(proposal_tables.proposals.iloc[0]["proposal_scores"])
+    for choice, vp in zip(whales["choice"], whales["vp"]):
+        scores[choice - 1] -= vp
+    assert filtered_tables.proposals.iloc[0]["proposal_scores"] == scores
+    assert proposal_tables.proposals.iloc[0]["proposal_scores"] != scores
+
+
+def test_get_whale_mask_uses_a_threshold_per_proposal():
+    votes = pd.DataFrame(
+        {
+            "proposal_id": ["0x1", "0x1", "0x2", "0x2"],
+            "voter": ["0xa", "0xb", "0xa", "0xb"],
+            "vp": [100.0, 1.0, 2.0, 3.0],
+        },
+        index=pd.Index(["0xa", "0xb", "0xa", "0xb"], name="Voter Address"),
+    )
+
+    assert list(get_whale_mask(votes, 0.9)) == [True, False, False, True]
+
+
+def test_filtering_all_proposals_at_once_matches_filtering_each_proposal():
+    proposal_tables = dataframes.all_proposals(dao_snapshot_data)
+    filtered_tables = dataframe_filters.filter_top_shareholders(
+        merge.into_single_tables(proposal_tables)
+    )
+    filtered_proposal_tables = merge.into_single_tables(
+        [
+            dataframe_filters.filter_top_shareholders_from_tables(proposal_table)
+            for proposal_table in proposal_tables
+        ]
+    )
+
+    assert filtered_tables.votes.equals(filtered_proposal_tables.votes)
+    assert filtered_tables.proposals.equals(filtered_proposal_tables.proposals)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stages import dataframe_filters, dataframes, merge
+from stages.dataframe_filters.data_processing.filters import get_whale_mask
+from stages.dataframe_filters.data_processing.reaggregation import get_choice_matrix
+from stages.tests.constants import dao_snapshot_data
+
+
+def reaggregate_votes_with_loops(
+    whales: pd.DataFrame, proposal_type: str, scores: list
+) -> list:
+    for _, whale in whales.iterrows():
+        if proposal_type == "approval":
+            for choice in whale["choice"]:
+                scores[choice - 1] -= whale["vp"]
+        elif proposal_type == "weighted":
+            weight_total = sum(whale["choice"].values())
+            for choice, weight in whale["choice"].items():
+                scores[int(choice) - 1] -= weight / weight_total * whale["vp"]
+        else:
+            choice = whale["choice"]
+            if type(choice) is dict:
+                choice = list(choice.values())[0]
+            scores[choice - 1] -= whale["vp"]
+    return scores
+
+
+@pytest.mark.parametrize("quartile", [0.5, 0.8, 0.95])
+def test_reaggregate_votes_matches_loops(quartile):
+    proposal_tables = merge.into_single_tables(
+        dataframes.all_proposals(dao_snapshot_data)
+    )
+    proposals = proposal_tables.proposals
+    whales = proposal_tables.votes[get_whale_mask(proposal_tables.votes, quartile)]
+
+    reaggregated_scores = dataframe_filters.reaggregate_votes(whales, proposals)
+
+    assert len(reaggregated_scores) == len(proposals)
+    for scores, (proposal_id, proposal) in zip(
+        reaggregated_scores, proposals.iterrows()
+    ):
+        assert scores == pytest.approx(
+            reaggregate_votes_with_loops(
+                whales[whales["proposal_id"] == proposal_id],
+                proposal["proposal_type"],
+                list(proposal["proposal_scores"]),
+            )
+        )
+
+
+def test_get_choice_matrix_decodes_every_choice_format():
+    assert np.array_equal(
+        get_choice_matrix(pd.Series([1, 3, 3]), "single-choice", 3),
+        [[1, 0, 0], [0, 0, 1], [0, 0, 1]],
+    )
+    assert np.array_equal(
+        get_choice_matrix(pd.Series([{"support": 2}, 1]), "basic", 3),
+        [[0, 1, 0], [1, 0, 0]],
+    )
+    assert np.array_equal(
+        get_choice_matrix(pd.Series([[1, 2], [], [3, 3]]), "approval", 3),
+        [[1, 1, 0], [0, 0, 0], [0, 0, 2]],
+    )
+    assert np.array_equal(
+        get_choice_matrix(pd.Series([{"1": 1, "3": 3}, {"2": 0}]), "weighted", 3),
+        [[0.25, 0, 0.75], [0, 0, 0]],
+    )
+
+
+def test_reaggregate_votes_keeps_choices_without_whales_unchanged():
+    whales = pd.DataFrame({"proposal_id": ["0x1"], "choice": [1], "vp": [2.5]})
+    proposals = pd.DataFrame(
+        {
+            "proposal_type": ["single-choice", "approval"],
+            "proposal_scores": [[10, 20], [1, 2, 3]],
+        },
+        index=pd.Index(["0x1", "0x2"], name="proposal_id"),
+    )
+
+    assert dataframe_filters.reaggregate_votes(whales, proposals) == [
+        [7.5, 20],
+        [1, 2, 3],
+    ]
+
+
+def test_reaggregate_votes_requires_unique_proposals():
+    proposal_tables = dataframes.all_proposals([dao_snapshot_data[0]] * 2)
+    proposals = pd.concat([tables.proposals for tables in proposal_tables])
+    votes = pd.concat([tables.votes for tables in proposal_tables])
+
+    with pytest.raises(AssertionError, match="unique"):
+        dataframe_filters.reaggregate_votes(votes, proposals)
+
+    merged_tables = merge.into_single_tables(proposal_tables)
+    single_tables = merge.into_single_tables(
+        dataframes.all_proposals([dao_snapshot_data[0]])
+    )
+    assert dataframe_filters.reaggregate_votes(
+        merged_tables.votes, merged_tables.proposals
+    ) == dataframe_filters.reaggregate_votes(
+        single_tables.votes, single_tables.proposals
+    )
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from stages import dataframe_filters, dataframes, merge
+from stages.dataframe_filters.data_processing.filters import get_whale_mask
+from stages.dataframe_filters.data_processing.sensitivity import get_whale_sensitivity
+from stages.tests.constants import dao_snapshot_data
+
+QUARTILES = [0.5, 0.8, 0.95, 0.99]
+
+
+@pytest.fixture
+def proposal_tables():
+    return merge.into_single_tables(dataframes.all_proposals(dao_snapshot_data))
+
+
+def test_whale_sensitivity_has_one_row_per_proposal_and_quartile(proposal_tables):
+    sensitivity = dataframe_filters.whale_sensitivity(proposal_tables, QUARTILES)
+
+    assert list(sensitivity.index) == [
+        (proposal_id, quartile)
+        for proposal_id in proposal_tables.proposals.index
+        for quartile in QUARTILES
+    ]
+
+
+@pytest.mark.parametrize("quartile", QUARTILES)
+def test_whale_sensitivity_matches_filtering(proposal_tables, quartile):
+    votes = proposal_tables.votes
+    whale_mask = get_whale_mask(votes, quartile)
+    whales = votes[whale_mask]
+    reaggregated_scores = dataframe_filters.reaggregate_votes(
+        whales, proposal_tables.proposals
+    )
+    sensitivity = dataframe_filters.whale_sensitivity(proposal_tables, QUARTILES).xs(
+        quartile, level="quartile"
+    )
+
+    for proposal_id, scores in zip(
+        proposal_tables.proposals.index, reaggregated_scores
+    ):
+        proposal_sensitivity = sensitivity.loc[proposal_id]
+        proposal_whales = whales[whales["proposal_id"] == proposal_id]
+        proposal_votes = votes[votes["proposal_id"] == proposal_id]
+        original_scores = proposal_tables.proposals.loc[proposal_id, "proposal_scores"]
+
+        assert proposal_sensitivity["filtered_scores"] == pytest.approx(scores)
+        assert proposal_sensitivity["number_of_whales"] == len(proposal_whales)
+        assert proposal_sensitivity["whale_vp"] == pytest.approx(
+            proposal_whales["vp"].sum()
+        )
+        assert proposal_sensitivity["whale_vp_share"] == pytest.approx(
+            proposal_whales["vp"].sum() / proposal_votes["vp"].sum()
+        )
+        assert proposal_sensitivity["winning_choice"] == (
+            original_scores.index(max(original_scores)) + 1
+        )
+        assert proposal_sensitivity["filtered_winning_choice"] == (
+            scores.index(max(scores)) + 1
+        )
+        assert proposal_sensitivity["winner_flipped"] == (
+            proposal_sensitivity["winning_choice"]
+            != proposal_sensitivity["filtered_winning_choice"]
+        )
+
+
+def test_whale_sensitivity_finds_winner_flips(proposal_tables):
+    sensitivity = dataframe_filters.whale_sensitivity(proposal_tables, [0.95])
+
+    assert sensitivity.loc[("0xsingle", 0.95), "winner_flipped"]
+    assert not sensitivity.loc[("0xapproval", 0.95), "winner_flipped"]
+
+
+def test_whale_sensitivity_requires_unique_proposals():
+    proposal_tables = dataframes.all_proposals([dao_snapshot_data[0]] * 2)
+
+    with pytest.raises(AssertionError, match="unique"):
+        get_whale_sensitivity(
+            pd.concat([tables.votes for tables in proposal_tables]),
+            pd.concat([tables.proposals for tables in proposal_tables]),
+            QUARTILES,
+        )
@@ -0,0 +1,134 @@
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+import pipeline
+from datatypes import DaoData
+from stages.dataframe_filters.data_processing import statistics
+from stages.tests.constants import dao_snapshot_data
+
+
+@pytest.fixture(scope="module")
+def reports():
+    return pipeline.get_reports(DaoData("plutocracy", dao_snapshot_data))
+
+
+@pytest.fixture(scope="module")
+def csv_reports(reports):
+    return [
+        pd.read_csv(StringIO(report.denormalize().to_csv()))
+        for report in [reports.unfiltered, reports.filtered]
+    ]
+
+
+def to_organization_map(report: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    return {
+        str(organization_name): organization_proposals
+        for organization_name, organization_proposals in report.groupby(
+            "proposal_organization_name"
+        )
+    }
+
+
+def test_get_proposal_statistics_from_tables_and_csv_match(reports, csv_reports):
+    table_statistics = statistics.get_proposal_statistics(
+        reports.unfiltered, reports.filtered
+    )
+    csv_statistics = statistics.get_proposal_statistics(*csv_reports)
+
+    assert list(table_statistics.index) == [
+        ("GoodDAO", "0xsingle"),
+        ("GoodDAO", "0xapproval"),
+        ("KindaGoodDAO", "0xweighted"),
+        ("KindaGoodDAO", "0xbasic"),
+    ]
+    pd.testing.assert_frame_equal(
+        table_statistics.reset_index(),
+        csv_statistics.reset_index(),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+def test_get_proposal_statistics(reports):
+    proposal_statistics = statistics.get_proposal_statistics(
+        reports.unfiltered, reports.filtered
+    ).loc["GoodDAO"]
+
+    single_choice = proposal_statistics.loc["0xsingle"]
+    assert single_choice["score_differences"] == [0.0, 785.0, 842.0]
+    assert single_choice["whale_vp_proportion"] == pytest.approx(1627 / 8585)
+    assert single_choice["outcome_changed"]
+    assert single_choice["outcome_old"] == "Abstain"
+    assert single_choice["outcome_new"] == "For"
+    assert single_choice["voter_count"] == 30
+
+    approval = proposal_statistics.loc["0xapproval"]
+    assert approval["whale_vp_proportion"] == pytest.approx(1000 / 38000)
+    assert not approval["outcome_changed"]
+
+
+def test_get_organization_statistics(csv_reports):
+    organization_statistics = statistics.get_organization_statistics(*csv_reports)
+
+    assert organization_statistics.to_dict("index") == {
+        "GoodDAO": {
+            "number_of_whales": 0,
+            "number_of_voters": 35,
+            "whale_pivotality": 0.5,
+        },
+        "KindaGoodDAO": {
+            "number_of_whales": 2,
+            "number_of_voters": 40,
+            "whale_pivotality": 0.5,
+        },
+    }
+
+
+def test_notebook_statistics(csv_reports):
+    dao_proposals, dao_proposals_filtered = map(to_organization_map, csv_reports)
+
+    score_comparisons = statistics.get_score_comparisons(
+        dao_proposals, dao_proposals_filtered
+    )
+    assert [list(comparison) for comparison in score_comparisons] == [
+        ["GoodDAO"],
+        ["KindaGoodDAO"],
+    ]
+    assert score_comparisons[1]["KindaGoodDAO"]["0xbasic"] == [
+        "0xbasic",
+        "Proposal 0xbasic",
+        1672790400,
+        1672876800,
+        [0.0, 2048.0, 0.0],
+        pytest.approx(2048 / 4350),
+        4350,
+        True,
+        "Against",
+        "For",
+    ]
+    assert statistics.get_number_of_whales_to_all_voters_ratio(
+        dao_proposals, dao_proposals_filtered
+    ) == [{"GoodDAO": [0, 35]}, {"KindaGoodDAO": [2, 40]}]
+    assert statistics.get_number_of_voters_per_proposal(dao_proposals)[
+        "KindaGoodDAO"
+    ].to_dict() == {"0xbasic": 20, "0xweighted": 40}
+
+
+def test_notebook_statistics_with_every_vote_filtered_out(csv_reports):
+    dao_proposals, dao_proposals_filtered = map(to_organization_map, csv_reports)
+    good_dao_proposals = dao_proposals_filtered["GoodDAO"]
+    dao_proposals_filtered["GoodDAO"] = good_dao_proposals.iloc[:0]
+
+    assert statistics.get_number_of_whales_to_all_voters_ratio(
+        dao_proposals, dao_proposals_filtered
+    ) == [{"GoodDAO": [35, 35]}, {"KindaGoodDAO": [2, 40]}]
+
+    dao_proposals["GoodDAO"] = good_dao_proposals.iloc[:0]
+    voters_per_proposal = statistics.get_number_of_voters_per_proposal(dao_proposals)
+    assert voters_per_proposal["GoodDAO"].empty
+    assert voters_per_proposal["KindaGoodDAO"].to_dict() == {
+        "0xbasic": 20,
+        "0xweighted": 40,
+    }
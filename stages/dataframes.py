@@ -1,36 +1,137 @@
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
 import pandas as pd
 
+from .datatypes import ProposalTables
 
-def create_dataframe_from(dao_snapshot_vote_data: list[dict]) -> pd.DataFrame:
-    verified_vote_data = [
-        vote_data for vote_data in dao_snapshot_vote_data if vote_data
-    ]
+
+# Fields of the proposals table, older payloads repeat them on every vote
+PROPOSAL_COLUMNS = [
+    "proposal_title",
+    "proposal_created",
+    "proposal_start",
+    "proposal_end",
+    "proposal_scores_total",
+    "proposal_state",
+    "proposal_organization_name",
+    "proposal_type",
+    "proposal_scores",
+    "proposal_choices",
+    "organization_id",
+    "proposal_organization_id",
+]
+CATEGORICAL_COLUMNS = [
+    "proposal_id",
+    "proposal_title",
+    "proposal_state",
+    "proposal_organization_name",
+    "proposal_type",
+    "organization_id",
+    "proposal_organization_id",
+]
+FLOAT_COLUMNS = ["vp", "proposal_scores_total"]
+INTEGER_COLUMNS = ["created", "proposal_created", "proposal_start", "proposal_end"]
+
+
+def get_typed_column(column: str, values: list) -> np.ndarray | pd.Categorical | list:
+    if column in FLOAT_COLUMNS:
+        return np.array(values, dtype="float64")
+    if column in INTEGER_COLUMNS and set(map(type, values)) == {int}:
+        return np.array(values, dtype="int64")
+    if column in CATEGORICAL_COLUMNS and set(map(type, values)) == {str}:
+        # Batches usually hold a single proposal, so most of these are constant
+        if values.count(values[0]) == len(values):
+            return pd.Categorical.from_codes(np.zeros(len(values), "int8"), values[:1])
+        return pd.Categorical(values)
+    return values
+
+
+def get_columns(votes: list[dict], excluded_columns: list[str] = []) -> dict[str, list]:
+    columns = dict.fromkeys(chain.from_iterable(votes))
+    for column in excluded_columns:
+        columns.pop(column, None)
+    if excluded_columns or any(len(vote) != len(columns) for vote in votes):
+        return {column: [vote.get(column) for vote in votes] for column in columns}
+    return {column: list(map(itemgetter(column), votes)) for column in columns}
+
+
+def create_dataframe_from(
+    dao_snapshot_vote_data: list[dict], excluded_columns: list[str] = []
+) -> pd.DataFrame:
+    unique_votes: dict[str, dict] = dict()
+    for vote in dao_snapshot_vote_data:
+        if vote:
+            unique_votes.setdefault(vote["id"], vote)
+    votes = list(unique_votes.values())
+
+    columns = get_columns(votes, excluded_columns)
     index = pd.Index(
-        [vote["voter"] for vote in verified_vote_data if vote],
+        columns.get("voter", []),
         "str",
         name="Voter Address",
         tupleize_cols=False,
     )
 
-    return (
-        pd.DataFrame(
-            verified_vote_data,
-            index=index,
-        )
-        .astype({"vp": "float", "proposal_scores_total": "float"})
-        .dropna(how="all")
-        .drop_duplicates(["id"])
+    return pd.DataFrame(
+        {column: get_typed_column(column, values) for column, values in columns.items()},
+        index=index,
+        copy=False,
+    )
+
+
+def create_proposals_dataframe_from(proposal_rows: list[dict]) -> pd.DataFrame:
+    columns = [
+        column
+        for column in PROPOSAL_COLUMNS
+        if any(column in proposal_row for proposal_row in proposal_rows)
+    ]
+    proposals_df = pd.DataFrame.from_records(
+        proposal_rows, index="proposal_id", columns=["proposal_id"] + columns
+    )
+    if "proposal_scores_total" in columns:
+        proposals_df["proposal_scores_total"] = proposals_df[
+            "proposal_scores_total"
+        ].astype("float64")
+    return proposals_df
+
+
+def get_proposal_row(proposal_payload: dict) -> dict | None:
+    if "proposal_row" in proposal_payload:
+        return proposal_payload["proposal_row"]
+
+    first_vote = next((vote for vote in proposal_payload["votes"] if vote), None)
+    if not first_vote:
+        return None
+    return {
+        column: first_vote[column]
+        for column in ["proposal_id"] + PROPOSAL_COLUMNS
+        if column in first_vote
+    }
+
+
+def create_tables_from(proposal_payload: dict) -> ProposalTables:
+    maybe_proposal_row = get_proposal_row(proposal_payload)
+    votes_df = create_dataframe_from(proposal_payload["votes"], PROPOSAL_COLUMNS)
+    if votes_df.empty or not maybe_proposal_row:
+        return ProposalTables(create_proposals_dataframe_from([]), votes_df)
+
+    return ProposalTables(
+        create_proposals_dataframe_from([maybe_proposal_row]),
+        votes_df,
+        maybe_proposal_row.get("proposal_organization_name"),
     )
 
 
 def all_proposals(
     dao_snapshot_datas: list[dict[str, dict]],
-) -> list[pd.DataFrame]:
+) -> list[ProposalTables]:
     print("Generating DFs for dao snapshot data")
-    proposal_dfs = []
+    proposal_tables = []
     validated_dao_data = [dao for dao in dao_snapshot_datas if type(dao) is dict]
     for dao in validated_dao_data:
         for proposal in dao.values():
-            proposal_dfs.append(create_dataframe_from(proposal["votes"]))
+            proposal_tables.append(create_tables_from(proposal))
 
-    return proposal_dfs
+    return proposal_tables
@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+
+@dataclass
+class ProposalTables:
+    # One row per proposal, indexed by `proposal_id`
+    proposals: pd.DataFrame
+    # One row per vote, indexed by voter and joined to `proposals` on `proposal_id`
+    votes: pd.DataFrame
+    organization_name: str | None = None
+
+    @property
+    def empty(self) -> bool:
+        return self.votes.empty
+
+    def get_proposal_rows(self, columns: list[str] | None = None) -> pd.DataFrame:
+        proposals = self.proposals if columns is None else self.proposals[columns]
+        proposal_rows = proposals.take(
+            proposals.index.get_indexer(self.votes["proposal_id"])
+        )
+        proposal_rows.index = self.votes.index
+        return proposal_rows
+
+    def denormalize(self) -> pd.DataFrame:
+        if self.empty:
+            return pd.DataFrame(index=self.votes.index)
+
+        split = self.votes.columns.get_loc("proposal_id") + 1
+        return pd.concat(
+            [
+                self.votes.iloc[:, :split],
+                self.get_proposal_rows(),
+                self.votes.iloc[:, split:],
+            ],
+            axis=1,
+        )
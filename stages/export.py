@@ -1,11 +1,248 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from json import dumps
+from numbers import Number
+from os import cpu_count
+from pathlib import Path
+from shutil import rmtree
+from threading import local
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .datatypes import ProposalTables
+
+
+# Partitioning by proposal as well would run into Arrow's limit of 1024
+# partitions per write, so `proposal_id` stays a column
+PARTITION_COLUMNS = ["proposal_organization_name"]
+# Columns whose type changes with the proposal type are always stored as JSON
+JSON_COLUMNS = ["choice"]
+PARQUET_COMPRESSIONS = ["zstd", "snappy", "gzip", "brotli", "lz4", "none"]
+CSV_COMPRESSIONS = ["gzip", "zstd", "lz4", "none"]
+CSV_EXTENSIONS = {"gzip": ".gzip", "zstd": ".zst", "lz4": ".lz4", "none": ""}
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6}
+CSV_CHUNK_ROWS = 50_000
+COMPRESSION_WORKERS = cpu_count() or 1
+
+
+class CsvWriter:
+    def __init__(
+        self,
+        file_name: str,
+        compression: str = "gzip",
+        compression_level: int | None = None,
+        chunk_rows: int = CSV_CHUNK_ROWS,
+        workers: int = COMPRESSION_WORKERS,
+    ):
+        self.compression = compression
+        self.compression_level = (
+            compression_level
+            if compression_level is not None
+            else DEFAULT_COMPRESSION_LEVELS.get(compression)
+        )
+        self.chunk_rows = chunk_rows
+        self.header_written = False
+        self.file = open(file_name + CSV_EXTENSIONS[compression], "wb")
+        self.executor = ThreadPoolExecutor(workers) if compression != "none" else None
+        self.max_pending = 2 * workers
+        self.pending: deque[Future[bytes]] = deque()
+        self.codecs = local()
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Every chunk becomes its own gzip member, zstd or lz4 frame, and
+        # concatenated members or frames decompress as a single stream
+        if not hasattr(self.codecs, "codec"):
+            self.codecs.codec = pa.Codec(self.compression, self.compression_level)
+        return self.codecs.codec.compress(chunk, asbytes=True)
+
+    def write_chunk(self, chunk: bytes):
+        if self.executor is None:
+            self.file.write(chunk)
+            return
+
+        self.pending.append(self.executor.submit(self.compress, chunk))
+        while len(self.pending) > self.max_pending:
+            self.file.write(self.pending.popleft().result())
+
+    def write(self, dataframe: pd.DataFrame):
+        for start in range(0, max(len(dataframe), 1), self.chunk_rows):
+            chunk = dataframe.iloc[start : start + self.chunk_rows].to_csv(
+                header=not self.header_written
+            )
+            self.header_written = True
+            if chunk:
+                self.write_chunk(chunk.encode())
+
+    def write_tables(self, proposal_tables: ProposalTables):
+        if not proposal_tables.empty:
+            self.write(proposal_tables.denormalize())
+
+    def close(self):
+        while self.pending:
+            self.file.write(self.pending.popleft().result())
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.file.close()
+
+    def __enter__(self) -> "CsvWriter":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
 
 
 def organization_dataframes_to_csv(
-    organization_dataframes: pd.DataFrame, file_name: str
+    report: ProposalTables,
+    file_name: str,
+    compression: str = "gzip",
+    compression_level: int | None = None,
 ):
     print("Generating csv...")
-    organization_dataframes.to_csv(
-        file_name + ".gzip", chunksize=50, compression="gzip"
+    with CsvWriter(file_name, compression, compression_level) as writer:
+        writer.write_tables(report)
+    print("Done")
+
+
+def whale_sensitivity_to_csv(
+    sensitivity: pd.DataFrame,
+    file_name: str,
+    compression: str = "gzip",
+    compression_level: int | None = None,
+):
+    print("Generating whale sensitivity csv...")
+    with CsvWriter(file_name, compression, compression_level) as writer:
+        writer.write(sensitivity)
+    print("Done")
+
+
+def get_arrow_type(values: pd.Series) -> pa.DataType | None:
+    present_values = values.dropna()
+    if present_values.empty:
+        return pa.dictionary(pa.int32(), pa.string())
+
+    value_types = set(present_values.map(type))
+    if value_types == {str}:
+        return pa.dictionary(pa.int32(), pa.string())
+    if value_types != {list}:
+        return None
+
+    item_types = set(type(item) for item_list in present_values for item in item_list)
+    if item_types == {str}:
+        return pa.list_(pa.string())
+    if all(issubclass(item_type, Number) for item_type in item_types):
+        return pa.list_(pa.float64())
+    return None
+
+
+def get_arrow_column(values: pd.Series) -> pa.Array:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if values.dtype != object and values.name not in JSON_COLUMNS:
+        return pa.array(values)
+
+    arrow_type = None if values.name in JSON_COLUMNS else get_arrow_type(values)
+    if arrow_type is None:
+        return pa.array(
+            [None if value is None else dumps(value) for value in values],
+            pa.string(),
+        )
+    if pa.types.is_list(arrow_type) and arrow_type.value_type == pa.float64():
+        values = values.map(
+            lambda item_list: (
+                item_list if item_list is None else [float(item) for item in item_list]
+            )
+        )
+    return pa.array(values, arrow_type, from_pandas=True)
+
+
+def dataframe_to_arrow(organization_dataframes: pd.DataFrame) -> pa.Table:
+    dataframe = organization_dataframes.reset_index()
+    return pa.Table.from_arrays(
+        [get_arrow_column(dataframe[column]) for column in dataframe.columns],
+        names=[str(column) for column in dataframe.columns],
+    )
+
+
+class ParquetDatasetWriter:
+    def __init__(
+        self,
+        path: str,
+        compression: str = "zstd",
+        compression_level: int | None = None,
+    ):
+        self.path = path
+        self.compression = compression
+        self.compression_level = compression_level
+        self.written_tables: set[str] = set()
+        self.number_of_writes = 0
+
+    def write(self, dataframe: pd.DataFrame, table_name: str):
+        table_path = Path(self.path) / table_name
+        # Every run writes the whole report again, so the previous dataset is
+        # dropped instead of keeping partitions of proposals that are gone
+        if table_name not in self.written_tables:
+            rmtree(table_path, ignore_errors=True)
+            self.written_tables.add(table_name)
+
+        pq.write_to_dataset(
+            dataframe_to_arrow(dataframe),
+            str(table_path),
+            partition_cols=PARTITION_COLUMNS,
+            basename_template=f"part-{self.number_of_writes}-{{i}}.parquet",
+            compression=self.compression,
+            compression_level=self.compression_level,
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.number_of_writes += 1
+
+    def write_tables(self, proposal_tables: ProposalTables):
+        if proposal_tables.empty:
+            return
+        self.write(proposal_tables.proposals, "proposals")
+        self.write(
+            proposal_tables.votes.assign(
+                proposal_organization_name=proposal_tables.get_proposal_rows(
+                    ["proposal_organization_name"]
+                )["proposal_organization_name"]
+            ),
+            "votes",
+        )
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "ParquetDatasetWriter":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def organization_dataframes_to_parquet(
+    report: ProposalTables,
+    path: str,
+    compression: str = "zstd",
+    compression_level: int | None = None,
+):
+    print("Generating parquet dataset...")
+    with ParquetDatasetWriter(path, compression, compression_level) as writer:
+        writer.write_tables(report)
+    print("Done")
+
+
+def whale_sensitivity_to_parquet(
+    sensitivity: pd.DataFrame,
+    path: str,
+    compression: str = "zstd",
+    compression_level: int | None = None,
+):
+    print("Generating whale sensitivity parquet...")
+    pq.write_table(
+        dataframe_to_arrow(sensitivity),
+        path + ".parquet",
+        compression=compression,
+        compression_level=compression_level,
     )
     print("Done")
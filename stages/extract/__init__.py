@@ -1,6 +1,9 @@
-from typing import Any, Callable
+from asyncio import create_task, gather, wait, FIRST_COMPLETED, Queue, Semaphore, Task
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
 from eth_utils.address import to_checksum_address
+from httpx import HTTPStatusError
 
 from .apis.deepdao.adapters import (
     get_snapshot_id,
@@ -10,23 +13,43 @@ from .apis.deepdao.queries import (
     get_raw_dao_list,
     get_raw_token_metadata,
 )
+from .apis.cache import response_cache
+from .apis.limits import rate_limits, report as get_retry_report
+from .apis.sessions import pooled_sessions
 from .apis.snapshot.execution import get_proposals as get_snapshot_proposals
 from .apis.tally.execution import (
     get_organizations,
+    get_proposal_votes,
     get_proposals as get_tally_proposals,
     get_votes,
 )
-from .datatypes import Request
+from . import state
+from .datatypes import Request, StoredProposal
 from .data_processing.filters import find_dao, get_valid_organizations
 from .data_processing.tally import (
     get_proposal_payload as get_tally_proposal_payload,
+    get_proposal_state as get_tally_proposal_state,
+    get_stored_proposal as get_stored_tally_proposal,
 )
-from .data_processing.snapshot import get_proposal_payload as get_snapshot_payload
+from .data_processing.snapshot import (
+    get_proposal_payload as get_snapshot_payload,
+    get_stored_proposal as get_stored_snapshot_proposal,
+)
+from .state import extraction_state
+
+
+T = TypeVar("T")
+U = TypeVar("U")
+
+
+async def with_pooled_sessions(extraction: Awaitable[T]) -> T:
+    async with pooled_sessions():
+        return await extraction
 
 
 async def get_dao_metadata(raw_dao: dict) -> dict[str, Any]:
     raw_dao_id: str = raw_dao.get("organizationId")
-    raw_dao_data = get_raw_dao_data(raw_dao_id)
+    raw_dao_data = await get_raw_dao_data(raw_dao_id)
     dao_snapshot_id = get_snapshot_id(raw_dao_data)
 
     return {
@@ -35,35 +58,145 @@ async def get_dao_metadata(raw_dao: dict) -> dict[str, Any]:
     }
 
 
+async def map_bounded(
+    function: Callable[[U], Awaitable[T]], items: list[U], concurrency: int
+) -> list[T]:
+    # Like gather, but only `concurrency` calls exist at a time and the
+    # results keep the order of the items
+    results: list[T] = []
+    pending: deque[Task] = deque()
+    try:
+        for item in items:
+            pending.append(create_task(function(item)))
+            if len(pending) >= concurrency:
+                results.append(await pending.popleft())
+        while pending:
+            results.append(await pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
+        await gather(*pending, return_exceptions=True)
+    return results
+
+
 async def get_valid_proposal_payloads(
     payload_function: Callable[[dict, dict], dict | None],
     raw_proposals: list[dict],
     dao_metadata: dict,
+    concurrency: int = 10,
 ):
-    for proposal in raw_proposals.copy():
-        yield (await payload_function(proposal, dao_metadata))
+    semaphore = Semaphore(concurrency)
+
+    async def get_bounded_payload(proposal: dict) -> dict | None:
+        async with semaphore:
+            try:
+                return await payload_function(proposal, dao_metadata)
+            except Exception as error:
+                print(f"[warning] Skipping proposal {proposal['id']}: {error!r}")
+                return None
+
+    # Keep a bounded window of proposals in flight and yield each payload, in
+    # order, as soon as it is ready
+    pending: deque[Task] = deque()
+    try:
+        for proposal in raw_proposals.copy():
+            pending.append(create_task(get_bounded_payload(proposal)))
+            if len(pending) >= 2 * concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        await gather(*pending, return_exceptions=True)
+
+
+async def get_snapshot_proposals_to_fetch(
+    dao_snapshot_id: str,
+    proposal_limit: int,
+    stored_proposals: dict[str, StoredProposal],
+) -> list[dict]:
+    if not stored_proposals:
+        return (await get_snapshot_proposals(dao_snapshot_id, proposal_limit))[
+            "proposals"
+        ]
 
+    raw_proposals: list[dict] = (
+        await get_snapshot_proposals(
+            dao_snapshot_id,
+            proposal_limit,
+            created_after=state.get_watermark(stored_proposals),
+        )
+    )["proposals"]
+    open_proposal_ids = state.get_open_proposal_ids(stored_proposals)
+    if open_proposal_ids:
+        raw_proposals.extend(
+            (
+                await get_snapshot_proposals(
+                    dao_snapshot_id, proposal_ids=open_proposal_ids
+                )
+            )["proposals"]
+        )
 
-async def get_single_dao_snapshot(
-    raw_dao: dict, proposal_limit: int = 0
-) -> dict[str, dict]:
+    return list({proposal["id"]: proposal for proposal in raw_proposals}.values())
+
+
+async def stream_single_dao_snapshot(
+    raw_dao: dict, proposal_limit: int = 0, concurrency: int = 10
+) -> AsyncIterator[dict[str, dict]]:
     print(f"Getting raw snapshot data for {raw_dao['daoName']}")
     dao_metadata = await get_dao_metadata(raw_dao)
     _, dao_snapshot_id = dao_metadata.values()
     if not dao_snapshot_id:
-        return {}
+        return
 
-    raw_proposals: list[dict] = (
-        await get_snapshot_proposals(dao_snapshot_id, proposal_limit)
-    )["proposals"]
+    store = state.get_store()
+    stored_proposals = (
+        store.load("snapshot", dao_snapshot_id, with_payloads=False) if store else {}
+    )
+    raw_proposals = await get_snapshot_proposals_to_fetch(
+        dao_snapshot_id, proposal_limit, stored_proposals
+    )
     print("\tDone getting proposals")
-    dao_proposals: dict[str, dict] = dict()
 
+    fetched_proposal_ids: set[str] = set()
+    proposal_index = 0
     async for maybe_payload in get_valid_proposal_payloads(
-        get_snapshot_payload, raw_proposals, dao_metadata
+        get_snapshot_payload, raw_proposals, dao_metadata, concurrency
     ):
+        proposal = raw_proposals[proposal_index]
+        proposal_index += 1
+        if maybe_payload is None:
+            continue
+
+        fetched_proposal_ids.add(proposal["id"])
+        if store:
+            store.save(
+                "snapshot",
+                dao_snapshot_id,
+                [get_stored_snapshot_proposal(proposal, maybe_payload)],
+            )
         if maybe_payload:
-            dao_proposals.update(maybe_payload.copy())
+            yield maybe_payload
+
+    for payload in state.iterate_stored_payloads(
+        "snapshot",
+        dao_snapshot_id,
+        stored_proposals,
+        fetched_proposal_ids,
+        proposal_limit,
+    ):
+        yield payload
+
+
+async def get_single_dao_snapshot(
+    raw_dao: dict, proposal_limit: int = 0, concurrency: int = 10
+) -> dict[str, dict]:
+    dao_proposals: dict[str, dict] = dict()
+    async for proposal_payload in stream_single_dao_snapshot(
+        raw_dao, proposal_limit, concurrency
+    ):
+        dao_proposals.update(proposal_payload)
     return dao_proposals
 
 
@@ -96,100 +229,423 @@ async def get_tally_organizations(raw_daos: list[dict]) -> list[dict[str, str]]:
     return (await get_organizations(organization_names))["organizations"]
 
 
-async def get_all_daos_tally(raw_daos: list[dict]) -> list[dict[str, dict]]:
-    organizations = await get_tally_organizations(raw_daos)
-    token_addresses = []
-    for raw_dao in raw_daos:
-        raw_dao_id = raw_dao.get("organizationId")
+async def get_token_address(raw_dao: dict) -> str | None:
+    raw_dao_id = raw_dao.get("organizationId")
+    try:
         maybe_token_metadata = await get_raw_token_metadata(raw_dao_id)
-        if maybe_token_metadata:
-            maybe_token_address = maybe_token_metadata.get("tokenAddress")
-            if maybe_token_address:
-                try:
-                    token_addresses.append(to_checksum_address(maybe_token_address))
-                except ValueError:
-                    print(f"[warning] Converting {maybe_token_address} to checksum")
+    except HTTPStatusError as error:
+        print(f"[warning] Skipping the token of {raw_dao_id}: {error!r}")
+        return None
+    if not maybe_token_metadata:
+        return None
+
+    maybe_token_address = maybe_token_metadata.get("tokenAddress")
+    if not maybe_token_address:
+        return None
+    try:
+        return to_checksum_address(maybe_token_address)
+    except ValueError:
+        print(f"[warning] Converting {maybe_token_address} to checksum")
+        return None
+
+
+async def get_token_addresses(raw_daos: list[dict], concurrency: int = 10) -> list[str]:
+    maybe_token_addresses = await map_bounded(get_token_address, raw_daos, concurrency)
+
+    return [token_address for token_address in maybe_token_addresses if token_address]
+
+
+async def get_governance_votes(
+    governance: dict,
+    concurrency: int = 10,
+    stored_proposals: dict[str, StoredProposal] | None = None,
+    semaphore: Semaphore | None = None,
+) -> list[dict] | None:
+    stored_proposals = stored_proposals or dict()
+    proposals: list[dict] = [
+        proposal
+        for proposal in governance["proposals"]
+        if str(proposal["id"]) not in stored_proposals
+        or stored_proposals[str(proposal["id"])].proposal_state != "closed"
+    ]
+    try:
+        print(f"getting votes for {governance['organization']['name']}")
+        votes = await get_votes(
+            governance["chainId"],
+            [str(proposal["id"]) for proposal in proposals],
+            [governance["id"]],
+            concurrency=concurrency,
+            semaphore=semaphore,
+            closed_proposal_ids={
+                str(proposal["id"])
+                for proposal in proposals
+                if get_tally_proposal_state(proposal) == "closed"
+            },
+        )
+        for proposal in proposals:
+            proposal["votes"] = votes[proposal["id"]]["votes"]
+    except Exception:
+        print(f"issue with {governance['organization']['name']}\n\n")
+        return None
+
+    return proposals
+
+
+async def get_governance_proposals(
+    proposals: list[dict],
+    governance_metadata: dict[str, str],
+    stored_proposals: dict[str, StoredProposal],
+) -> dict[str, dict]:
+    dao_proposals = await sanitize_tally_proposals(proposals, governance_metadata)
+    new_proposals = [
+        get_stored_tally_proposal(
+            proposal,
+            {proposal["id"]: dao_proposals[proposal["id"]]}
+            if proposal["id"] in dao_proposals
+            else {},
+        )
+        for proposal in proposals
+    ]
+
+    store = state.get_store()
+    if store:
+        store.save("tally", governance_metadata["id"], new_proposals)
+    return state.merge_payloads(stored_proposals, new_proposals)
+
+
+async def stream_governance_proposals(
+    governance: dict,
+    concurrency: int = 10,
+    stored_proposals: dict[str, StoredProposal] | None = None,
+) -> AsyncIterator[dict[str, dict]]:
+    stored_proposals = stored_proposals or dict()
+    governance_metadata = {k: v for k, v in governance.items() if type(v) is str}
+    if not governance_metadata.get("id"):
+        return
+    proposals: list[dict] = [
+        proposal
+        for proposal in governance["proposals"]
+        if str(proposal["id"]) not in stored_proposals
+        or stored_proposals[str(proposal["id"])].proposal_state != "closed"
+    ]
+
+    async def get_proposal_payload(proposal: dict, governance_metadata: dict) -> dict:
+        maybe_votes = await get_proposal_votes(
+            governance["chainId"],
+            str(proposal["id"]),
+            [governance["id"]],
+            closed=get_tally_proposal_state(proposal) == "closed",
+        )
+        proposal["votes"] = maybe_votes["votes"] if maybe_votes else []
+        return await get_tally_proposal_payload(proposal, governance_metadata)
+
+    print(f"getting votes for {governance['organization']['name']}")
+    store = state.get_store()
+    fetched_proposal_ids: set[str] = set()
+    proposal_index = 0
+    async for maybe_payload in get_valid_proposal_payloads(
+        get_proposal_payload, proposals, governance_metadata, concurrency
+    ):
+        proposal = proposals[proposal_index]
+        proposal_index += 1
+        if maybe_payload is None:
+            continue
+
+        fetched_proposal_ids.add(str(proposal["id"]))
+        if store:
+            store.save(
+                "tally",
+                governance_metadata["id"],
+                [get_stored_tally_proposal(proposal, maybe_payload)],
+            )
+        if maybe_payload:
+            yield maybe_payload
 
+    for payload in state.iterate_stored_payloads(
+        "tally", governance_metadata["id"], stored_proposals, fetched_proposal_ids
+    ):
+        yield payload
+
+
+async def get_tally_governances(
+    raw_daos: list[dict], concurrency: int = 10
+) -> dict[str, list[dict]]:
+    organizations, token_addresses = await gather(
+        get_tally_organizations(raw_daos),
+        get_token_addresses(raw_daos, concurrency),
+    )
     organizations = get_valid_organizations(token_addresses, organizations)
 
-    governances = await get_tally_proposals(
-        [organization["id"] for organization in organizations]
+    return await get_tally_proposals(
+        [organization["id"] for organization in organizations],
+        concurrency=concurrency,
     )
-    governance_metadatas: list[dict] = []
-    proposals_payload: list[list] = []
+
+
+async def stream_all_daos_tally(
+    raw_daos: list[dict], concurrency: int = 10
+) -> AsyncIterator[dict[str, dict]]:
+    governances = await get_tally_governances(raw_daos, concurrency)
+    store = state.get_store()
 
     for governance in governances["governances"]:
-        proposals: list[dict] = governance["proposals"]
+        stored_proposals = (
+            store.load("tally", governance["id"], with_payloads=False) if store else {}
+        )
         try:
-            print(f"getting votes for {governance['organization']['name']}")
-            votes = await get_votes(
-                governance["chainId"],
-                [str(proposal["id"]) for proposal in proposals],
-                [governance["id"]],
-            )
-
+            async for proposal_payload in stream_governance_proposals(
+                governance, concurrency, stored_proposals
+            ):
+                yield proposal_payload
         except Exception:
             print(f"issue with {governance['organization']['name']}\n\n")
-            continue
-        for proposal in proposals:
-            proposal["votes"] = votes[proposal["id"]]["votes"].copy()
 
-        proposals_payload.append(proposals)
+
+async def get_all_daos_tally(
+    raw_daos: list[dict], concurrency: int = 10
+) -> list[dict[str, dict]]:
+    governances = await get_tally_governances(raw_daos, concurrency)
+    store = state.get_store()
+    stored_governances: list[dict[str, StoredProposal]] = [
+        store.load("tally", governance["id"]) if store else {}
+        for governance in governances["governances"]
+    ]
+    # Governances share one limit, so `concurrency` bounds the vote requests
+    # of the whole run and not those of each governance
+    semaphore = Semaphore(concurrency)
+
+    async def get_shared_governance_votes(
+        governance_and_stored_proposals: tuple[dict, dict[str, StoredProposal]]
+    ) -> list[dict] | None:
+        governance, stored_proposals = governance_and_stored_proposals
+        return await get_governance_votes(
+            governance, concurrency, stored_proposals, semaphore
+        )
+
+    maybe_proposals_payload = await map_bounded(
+        get_shared_governance_votes,
+        list(zip(governances["governances"], stored_governances)),
+        concurrency,
+    )
+    governance_metadatas: list[dict] = []
+    proposals_payload: list[list] = []
+    stored_payload: list[dict[str, StoredProposal]] = []
+
+    for governance, stored_proposals, maybe_proposals in zip(
+        governances["governances"], stored_governances, maybe_proposals_payload
+    ):
+        if maybe_proposals is None:
+            continue
+        proposals_payload.append(maybe_proposals)
+        stored_payload.append(stored_proposals)
         governance_metadatas.append(
             {k: v for k, v in governance.items() if type(v) is str}
         )
 
     return [
-        await sanitize_tally_proposals(proposals, governance_metadata)
-        for proposals, governance_metadata in zip(
+        await get_governance_proposals(proposals, governance_metadata, stored_proposals)
+        for proposals, governance_metadata, stored_proposals in zip(
             proposals_payload,
             governance_metadatas,
+            stored_payload,
         )
     ]
 
 
 async def select_dimension(
-    raw_dao: dict | list[dict], proposal_limit: int = 0, from_onchain: bool = False
+    raw_dao: dict | list[dict],
+    proposal_limit: int = 0,
+    from_onchain: bool = False,
+    concurrency: int = 10,
 ) -> list[dict] | dict[str, dict]:
     if from_onchain:
-        return await get_all_daos_tally(raw_dao)
+        return await get_all_daos_tally(raw_dao, concurrency)
     else:
-        return await get_single_dao_snapshot(raw_dao, proposal_limit)
+        return await get_single_dao_snapshot(raw_dao, proposal_limit, concurrency)
+
+
+async def get_first_valid_daos(
+    get_dao_data: Callable[[dict], Awaitable[dict[str, dict]]],
+    raw_daos: list[dict],
+    max_number_of_daos: int,
+    concurrency: int = 4,
+) -> list[dict[str, dict]]:
+    pending: dict[Task, int] = dict()
+    results: dict[int, dict[str, dict]] = dict()
+    daos: list[dict[str, dict]] = []
+    next_index = 0
+    settled_index = 0
+
+    def schedule():
+        nonlocal next_index
+        # Only start as many DAOs as could still be needed to reach the target
+        while (
+            len(pending) < concurrency
+            and next_index < len(raw_daos)
+            and len(daos) + len(pending) + sum(map(bool, results.values()))
+            < max_number_of_daos
+        ):
+            pending[create_task(get_dao_data(raw_daos[next_index]))] = next_index
+            next_index += 1
+
+    schedule()
+    try:
+        while pending:
+            done, _ = await wait(pending.keys(), return_when=FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                try:
+                    results[index] = task.result()
+                except Exception as error:
+                    print(f"[warning] Skipping {raw_daos[index]['daoName']}: {error!r}")
+                    results[index] = {}
+
+            while settled_index in results:
+                maybe_dao_data = results.pop(settled_index)
+                settled_index += 1
+                if maybe_dao_data:
+                    daos.append(maybe_dao_data)
+                    if len(daos) == max_number_of_daos:
+                        return daos
+            schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+        await gather(*pending, return_exceptions=True)
 
+    return daos
 
-async def dao_snapshot_data(request: Request) -> list[dict]:
-    raw_daos: list[dict] = get_raw_dao_list(request.limit)
-    whitelisted_raw_daos = [
+
+async def stream_first_valid_daos(
+    stream_dao_data: Callable[[dict], AsyncIterator[dict[str, dict]]],
+    raw_daos: list[dict],
+    max_number_of_daos: int,
+    concurrency: int = 4,
+    buffer_size: int = 10,
+) -> AsyncIterator[dict[str, dict]]:
+    finished = object()
+    streams: deque[tuple[Task, Queue]] = deque()
+    next_index = 0
+    number_of_daos = 0
+
+    async def buffer_dao_data(raw_dao: dict, queue: Queue):
+        try:
+            async for proposal_payload in stream_dao_data(raw_dao):
+                await queue.put(proposal_payload)
+        except Exception as error:
+            print(f"[warning] Skipping {raw_dao['daoName']}: {error!r}")
+        await queue.put(finished)
+
+    def schedule():
+        nonlocal next_index
+        # Later DAOs fill a bounded buffer while the earliest one is consumed
+        while (
+            len(streams) < concurrency
+            and next_index < len(raw_daos)
+            and number_of_daos + len(streams) < max_number_of_daos
+        ):
+            queue = Queue(buffer_size)
+            streams.append(
+                (create_task(buffer_dao_data(raw_daos[next_index], queue)), queue)
+            )
+            next_index += 1
+
+    schedule()
+    try:
+        while streams:
+            _, queue = streams[0]
+            is_valid_dao = False
+            while (proposal_payload := await queue.get()) is not finished:
+                is_valid_dao = True
+                yield proposal_payload
+
+            streams.popleft()
+            if is_valid_dao:
+                number_of_daos += 1
+                if number_of_daos == max_number_of_daos:
+                    return
+            schedule()
+    finally:
+        for task, _ in streams:
+            task.cancel()
+        await gather(*[task for task, _ in streams], return_exceptions=True)
+
+
+def get_whitelisted_raw_daos(raw_daos: list[dict], request: Request) -> list[dict]:
+    return [
         raw_dao for raw_dao in raw_daos if raw_dao["daoName"] not in request.blacklist
     ]
+
+
+async def dao_snapshot_data(request: Request) -> list[dict]:
+    raw_daos: list[dict] = await get_raw_dao_list(request.limit)
+    whitelisted_raw_daos = get_whitelisted_raw_daos(raw_daos, request)
     daos: list[dict] = []
-    valid_daos = 0
 
     if request.use_tally:
         daos = await select_dimension(
             whitelisted_raw_daos[: request.max_number_of_daos],
             request.proposal_limit,
             True,
+            request.concurrency,
         )
     else:
-        for raw_dao in whitelisted_raw_daos:
-            maybe_dao_data: dict[str, dict] = await select_dimension(
-                raw_dao, request.proposal_limit, request.use_tally
-            )
-            if maybe_dao_data:
-                daos.append(maybe_dao_data)
-                valid_daos += 1
-                if valid_daos == request.max_number_of_daos:
-                    break
+        daos = await get_first_valid_daos(
+            lambda raw_dao: select_dimension(
+                raw_dao, request.proposal_limit, request.use_tally, request.concurrency
+            ),
+            whitelisted_raw_daos,
+            request.max_number_of_daos,
+            request.dao_concurrency,
+        )
 
     return daos
 
 
 async def dao_snapshot_data_for(request: Request) -> dict[str, dict]:
-    raw_daos = get_raw_dao_list(request.limit)
+    raw_daos = await get_raw_dao_list(request.limit)
     raw_dao: dict = find_dao(request.dao_name, raw_daos)
 
     if not raw_dao:
         return {}
 
-    return await get_single_dao_snapshot(raw_dao, request.proposal_limit)
+    return await get_single_dao_snapshot(
+        raw_dao, request.proposal_limit, request.concurrency
+    )
+
+
+async def stream_dao_snapshot_data(request: Request) -> AsyncIterator[dict[str, dict]]:
+    raw_daos: list[dict] = await get_raw_dao_list(request.limit)
+    whitelisted_raw_daos = get_whitelisted_raw_daos(raw_daos, request)
+
+    if request.use_tally:
+        proposal_payloads = stream_all_daos_tally(
+            whitelisted_raw_daos[: request.max_number_of_daos], request.concurrency
+        )
+    else:
+        proposal_payloads = stream_first_valid_daos(
+            lambda raw_dao: stream_single_dao_snapshot(
+                raw_dao, request.proposal_limit, request.concurrency
+            ),
+            whitelisted_raw_daos,
+            request.max_number_of_daos,
+            request.dao_concurrency,
+        )
+
+    async for proposal_payload in proposal_payloads:
+        yield proposal_payload
+
+
+async def stream_dao_snapshot_data_for(
+    request: Request,
+) -> AsyncIterator[dict[str, dict]]:
+    raw_daos = await get_raw_dao_list(request.limit)
+    raw_dao: dict = find_dao(request.dao_name, raw_daos)
+
+    if not raw_dao:
+        return
+
+    async for proposal_payload in stream_single_dao_snapshot(
+        raw_dao, request.proposal_limit, request.concurrency
+    ):
+        yield proposal_payload
@@ -0,0 +1,167 @@
+import sqlite3
+from contextlib import contextmanager
+from hashlib import sha256
+from json import dumps, loads
+from os import getenv
+from pathlib import Path
+from time import time
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+from zlib import compress, decompress
+
+from graphql import DocumentNode, print_ast
+
+
+T = TypeVar("T")
+
+CACHE_DIRECTORY = Path(getenv("GOV_ANALYSIS_CACHE", ".cache"))
+CACHE_PATH = CACHE_DIRECTORY / "responses.sqlite"
+MAX_CACHE_BYTES = 2 * 1024**3
+HOUR = 60 * 60
+
+# Seconds each class of response stays fresh, `None` never expires
+TTLS: dict[str, float | None] = {
+    "dao_list": 6 * HOUR,
+    "dao_data": 24 * HOUR,
+    "token_metadata": 7 * 24 * HOUR,
+    "organizations": 24 * HOUR,
+    "proposals": HOUR,
+    "open_votes": HOUR / 12,
+    "closed_votes": None,
+}
+
+
+class ResponseCache:
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+            """
+        )
+        self.size: int = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Any | None:
+        row = self.connection.execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at < time():
+            self.delete(key)
+            return None
+        with self.connection:
+            self.connection.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time(), key)
+            )
+        return loads(decompress(value))
+
+    def put(self, key: str, value: Any, ttl: float | None):
+        blob = compress(dumps(value).encode())
+        now = time()
+        self.delete(key)
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), None if ttl is None else now + ttl, now),
+            )
+        self.size += len(blob)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def delete(self, key: str):
+        row = self.connection.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.size -= row[0]
+
+    def evict(self):
+        target_size = self.max_bytes * 0.9
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM responses WHERE expires_at < ?", (time(),)
+            )
+            self.size = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            rows = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_used"
+            )
+            evicted_keys = []
+            for key, size in rows:
+                if self.size <= target_size:
+                    break
+                evicted_keys.append((key,))
+                self.size -= size
+            self.connection.executemany(
+                "DELETE FROM responses WHERE key = ?", evicted_keys
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+_cache: ResponseCache | None = None
+
+
+@contextmanager
+def response_cache(
+    enabled: bool = True, path: Path = CACHE_PATH, max_bytes: int = MAX_CACHE_BYTES
+) -> Iterator[ResponseCache | None]:
+    global _cache
+
+    _cache = ResponseCache(path, max_bytes) if enabled else None
+    try:
+        yield _cache
+    finally:
+        if _cache:
+            _cache.close()
+        _cache = None
+
+
+def get_key(endpoint: str, query: DocumentNode | str, variables: dict = None) -> str:
+    normalized_query = print_ast(query) if isinstance(query, DocumentNode) else query
+    normalized_query = " ".join(normalized_query.split())
+
+    return sha256(
+        dumps([endpoint, normalized_query, variables or {}], sort_keys=True).encode()
+    ).hexdigest()
+
+
+async def cached(
+    endpoint: str,
+    query: DocumentNode | str,
+    request: Callable[[], Awaitable[T]],
+    data_class: str | Callable[[T], str],
+    variables: dict = None,
+) -> T:
+    if _cache is None:
+        return await request()
+
+    key = get_key(endpoint, query, variables)
+    maybe_result = _cache.get(key)
+    if maybe_result is not None:
+        return maybe_result
+
+    result = await request()
+    if callable(data_class):
+        data_class = data_class(result)
+    _cache.put(key, result, TTLS[data_class])
+    return result
@@ -1,35 +1,49 @@
 from typing import Any
 
-from httpx import AsyncClient, Client, Timeout
+from httpx import AsyncClient, Timeout
 
+from ..cache import cached
+from ..limits import limited
+from ..sessions import get_http_client
 from .deep_dao_headers import headers
 
 
 TIMEOUT = Timeout(10.0, connect=30.0, read=30.0)
 
 
-def get_raw_dao_list(limit: int) -> list[dict]:
+def get_client() -> AsyncClient:
+    return get_http_client("deepdao", headers=headers, timeout=TIMEOUT)
+
+
+async def get_json(url: str) -> Any:
+    resp = await get_client().get(url)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def get_cached_json(url: str, data_class: str) -> Any:
+    return await cached(
+        "deepdao", url, lambda: limited("deepdao", lambda: get_json(url)), data_class
+    )
+
+
+async def get_raw_dao_list(limit: int) -> list[dict]:
     url = f"https://deepdao-server.deepdao.io/dashboard/ksdf3ksa-937slj3?limit={limit}&offset=0&orderBy=totalValueUSD&order=DESC"
 
-    with Client(headers=headers, timeout=TIMEOUT) as client:
-        resp = client.get(url)
-        return resp.json()["daosSummary"]
+    resp_json = await get_cached_json(url, "dao_list")
+    return resp_json["daosSummary"]
 
 
 async def get_raw_token_metadata(organization_id: str) -> dict[str, str]:
     url = f"https://deepdao-server.deepdao.io/discussion/{organization_id}/projectToken"
 
-    async with AsyncClient(headers=headers, timeout=TIMEOUT) as client:
-        resp = await client.get(url)
-        resp_json: dict[str, str] = resp.json()
-        return resp_json.get("data")
+    resp_json: dict[str, str] = await get_cached_json(url, "token_metadata")
+    return resp_json.get("data")
 
 
-def get_raw_dao_data(organization_id: str) -> list[dict]:
+async def get_raw_dao_data(organization_id: str) -> list[dict]:
     url = f"https://deepdao-server.deepdao.io/organization/ksdf3ksa-937slj3/{organization_id}/dao"
 
-    with Client(headers=headers, timeout=TIMEOUT) as client:
-        resp = client.get(url)
-        resp_json = resp.json()["data"]
+    resp_json = (await get_cached_json(url, "dao_data"))["data"]
 
-        return resp_json
+    return resp_json
@@ -0,0 +1,169 @@
+from asyncio import sleep
+from asyncio.exceptions import TimeoutError
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from random import uniform
+from time import monotonic
+from typing import Awaitable, Callable, Iterator, Mapping, TypeVar
+
+from aiohttp import ClientError, ClientResponseError
+from gql.transport.exceptions import TransportServerError
+from httpx import HTTPStatusError, TransportError
+
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# (requests per second, burst size) for each API. The Snapshot hub allows 60
+# requests a minute to clients without an API key.
+ENDPOINT_LIMITS = {
+    "snapshot": (1.0, 10),
+    "tally": (1.0, 5),
+    "deepdao": (5.0, 10),
+}
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 6
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def get_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    capacity: float
+    min_rate: float = 0.1
+    tokens: float = None
+    max_rate: float = None
+    updated: float = field(default_factory=monotonic)
+
+    def __post_init__(self):
+        if self.tokens is None:
+            self.tokens = self.capacity
+        if self.max_rate is None:
+            self.max_rate = self.rate
+
+    def reserve(self) -> float:
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        self.tokens -= 1
+
+        return max(0.0, -self.tokens / self.rate)
+
+    def throttle(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+RETRY_POLICY = RetryPolicy()
+buckets: dict[str, TokenBucket] = dict()
+retry_counts: Counter[tuple[str, str]] = Counter()
+
+
+def get_bucket(endpoint: str) -> TokenBucket:
+    if endpoint not in buckets:
+        buckets[endpoint] = TokenBucket(*ENDPOINT_LIMITS[endpoint])
+    return buckets[endpoint]
+
+
+@contextmanager
+def rate_limits(rates: Mapping[str, float]) -> Iterator[None]:
+    for endpoint, rate in rates.items():
+        buckets[endpoint] = TokenBucket(rate, ENDPOINT_LIMITS[endpoint][1])
+    try:
+        yield
+    finally:
+        for endpoint in rates:
+            buckets.pop(endpoint, None)
+
+
+def get_status_code(error: Exception) -> int | None:
+    if isinstance(error, TransportServerError):
+        return error.code
+    if isinstance(error, HTTPStatusError):
+        return error.response.status_code
+    return None
+
+
+def get_response_headers(error: Exception) -> Mapping[str, str]:
+    if isinstance(error, HTTPStatusError):
+        return error.response.headers
+    if isinstance(error.__cause__, ClientResponseError):
+        return error.__cause__.headers or {}
+    return {}
+
+
+def get_retry_after(error: Exception) -> float | None:
+    retry_after = get_response_headers(error).get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (TransportServerError, HTTPStatusError)):
+        status_code = get_status_code(error)
+        return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+    return isinstance(error, (TimeoutError, ClientError, TransportError))
+
+
+def on_failure(endpoint: str, error: Exception, attempt: int) -> float:
+    if not is_retryable(error) or attempt + 1 >= RETRY_POLICY.max_attempts:
+        retry_counts[(endpoint, "failures")] += 1
+        raise error
+
+    retry_counts[(endpoint, "retries")] += 1
+    if get_status_code(error) == 429:
+        retry_counts[(endpoint, "throttled")] += 1
+        get_bucket(endpoint).throttle()
+
+    return RETRY_POLICY.get_delay(attempt, get_retry_after(error))
+
+
+async def limited(endpoint: str, request: Callable[[], Awaitable[T]]) -> T:
+    bucket = get_bucket(endpoint)
+    for attempt in range(RETRY_POLICY.max_attempts):
+        await sleep(bucket.reserve())
+        try:
+            result = await request()
+        except Exception as error:
+            await sleep(on_failure(endpoint, error, attempt))
+        else:
+            bucket.recover()
+            return result
+
+
+def report() -> list[str]:
+    endpoints = sorted({endpoint for endpoint, _ in retry_counts})
+    return [
+        f"{endpoint}: {retry_counts[(endpoint, 'retries')]} retries "
+        f"({retry_counts[(endpoint, 'throttled')]} throttled), "
+        f"{retry_counts[(endpoint, 'failures')]} failures"
+        for endpoint in endpoints
+    ]
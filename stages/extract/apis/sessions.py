@@ -0,0 +1,89 @@
+from asyncio import Lock
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Mapping
+
+from aiohttp import TCPConnector
+from gql import Client
+from gql.client import AsyncClientSession
+from gql.transport.aiohttp import AIOHTTPTransport
+from httpx import AsyncClient, Limits, Timeout
+
+
+CONNECTIONS_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 30
+
+_clients: dict[str, Client] = dict()
+_graphql_sessions: dict[str, AsyncClientSession] = dict()
+_http_clients: dict[str, AsyncClient] = dict()
+_lock: Lock | None = None
+
+
+async def get_graphql_session(
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    timeout: int | None = None,
+) -> AsyncClientSession:
+    global _lock
+
+    if url in _graphql_sessions:
+        return _graphql_sessions[url]
+    if _lock is None:
+        _lock = Lock()
+
+    async with _lock:
+        if url not in _graphql_sessions:
+            transport = AIOHTTPTransport(
+                url=url,
+                headers=headers,
+                timeout=timeout,
+                client_session_args={
+                    "connector": TCPConnector(
+                        limit_per_host=CONNECTIONS_PER_HOST,
+                        keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    )
+                },
+            )
+            client = Client(transport=transport)
+            _graphql_sessions[url] = await client.connect_async()
+            _clients[url] = client
+
+    return _graphql_sessions[url]
+
+
+def get_http_client(
+    name: str,
+    headers: Mapping[str, str] | None = None,
+    timeout: Timeout | None = None,
+) -> AsyncClient:
+    if name not in _http_clients:
+        _http_clients[name] = AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            limits=Limits(
+                max_connections=CONNECTIONS_PER_HOST,
+                max_keepalive_connections=CONNECTIONS_PER_HOST,
+                keepalive_expiry=KEEPALIVE_TIMEOUT,
+            ),
+        )
+    return _http_clients[name]
+
+
+async def close_sessions():
+    global _lock
+
+    for client in _clients.values():
+        await client.close_async()
+    for http_client in _http_clients.values():
+        await http_client.aclose()
+    _clients.clear()
+    _graphql_sessions.clear()
+    _http_clients.clear()
+    _lock = None
+
+
+@asynccontextmanager
+async def pooled_sessions() -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await close_sessions()
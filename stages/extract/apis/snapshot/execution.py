@@ -1,54 +1,134 @@
-from asyncio import sleep
-from asyncio.exceptions import TimeoutError
+from typing import AsyncIterator, Callable
 
-from gql import Client
-from gql.transport.aiohttp import AIOHTTPTransport
-from gql.transport.exceptions import TransportServerError
 from graphql import DocumentNode
 
+from ..cache import cached
+from ..limits import limited
+from ..sessions import get_graphql_session
 from .queries import proposals, votes
 
-transport = AIOHTTPTransport(url="https://hub.snapshot.org/graphql")
+SNAPSHOT_URL = "https://hub.snapshot.org/graphql"
+VOTES_PAGE_SIZE = 1000
+# The hub rejects larger offsets
+MAX_VOTES_SKIP = 5000
 
-client = Client(transport=transport)
 
+def get_votes_data_class(result: dict[str, list[dict]]) -> str:
+    closed = result["votes"] and all(
+        vote["proposal"]["state"] == "closed" for vote in result["votes"]
+    )
+    return "closed_votes" if closed else "open_votes"
 
-async def try_result(client: Client, query: DocumentNode) -> dict[str, list[dict]]:
-    session = await client.connect_async(reconnecting=True)
 
-    try:
-        result = await session.execute(query)
-    except (TransportServerError, TimeoutError):
-        await client.close_async()
-        await sleep(21)
-        return await try_result(client, query)
-    finally:
-        await client.close_async()
+async def try_result(
+    query: DocumentNode, data_class: str | Callable[[dict], str] = "proposals"
+) -> dict[str, list[dict]]:
+    session = await get_graphql_session(SNAPSHOT_URL)
 
-    return result
+    return await cached(
+        "snapshot",
+        query,
+        lambda: limited("snapshot", lambda: session.execute(query)),
+        data_class,
+    )
 
 
 async def get_proposals(
-    organization_id: str, upper_limit: int = 0, skip: int = 0
+    organization_id: str,
+    upper_limit: int = 0,
+    skip: int = 0,
+    created_after: int | None = None,
+    proposal_ids: list[str] | None = None,
 ) -> dict[str, list[dict]]:
-    query = proposals(organization_id, upper_limit, skip=skip)
-    result = await try_result(client, query)
+    query = proposals(
+        organization_id,
+        upper_limit,
+        skip=skip,
+        created_after=created_after,
+        proposal_ids=proposal_ids,
+    )
+    result = await try_result(query)
 
     if not result["proposals"]:
         return {"proposals": []}
     return result
 
 
-async def get_votes(proposal_id: str, skip: int = 0) -> dict[str, list[dict]]:
-    query = votes(proposal_id, skip)
-    result = await try_result(client, query)
+async def get_votes_page(
+    proposal_id: str,
+    where: dict[str, int | float],
+    order_by: str = "created",
+    skip: int = 0,
+) -> list[dict]:
+    query = votes(proposal_id, where, order_by, skip=skip, first=VOTES_PAGE_SIZE)
+    return (await try_result(query, get_votes_data_class))["votes"]
+
+
+async def iterate_skipped_votes(
+    proposal_id: str, where: dict[str, int | float]
+) -> AsyncIterator[list[dict]]:
+    # Votes that share every field they can be ordered by are only reachable
+    # with `skip`, which the hub caps. It has no stable order between them,
+    # so the pages can overlap.
+    seen_ids: set[str] = set()
+    for skip in range(0, MAX_VOTES_SKIP + 1, VOTES_PAGE_SIZE):
+        page = await get_votes_page(proposal_id, where, "vp", skip)
+        new_votes = [vote for vote in page if vote["id"] not in seen_ids]
+        seen_ids.update(vote["id"] for vote in new_votes)
+        if new_votes:
+            yield new_votes
+        if len(page) < VOTES_PAGE_SIZE:
+            return
+    print(f"\tproposal {proposal_id} has more votes matching {where} than skip reaches")
+
+
+async def iterate_votes(
+    proposal_id: str,
+    order_by: str = "created",
+    where: dict[str, int | float] | None = None,
+) -> AsyncIterator[list[dict]]:
+    where = where or dict()
+    cursor: dict[str, int | float] = dict()
+    boundary_ids: set[str] = set()
 
-    if not result["votes"]:
-        return {"votes": []}
-    if skip < 4999:
-        if skip == 4000:
-            skip -= 1
-        result["votes"].extend(
-            (await get_votes(proposal_id, skip + 1000))["votes"].copy()
+    while True:
+        page = await get_votes_page(proposal_id, {**where, **cursor}, order_by)
+        new_votes = [vote for vote in page if vote["id"] not in boundary_ids]
+        if len(page) < VOTES_PAGE_SIZE:
+            if new_votes:
+                yield new_votes
+            return
+
+        last_value = page[-1][order_by]
+        if page[0][order_by] != last_value:
+            # The next page starts over at the last value, so the votes of that
+            # value already read are dropped from it
+            yield new_votes
+            boundary_ids = {vote["id"] for vote in page if vote[order_by] == last_value}
+            cursor = {f"{order_by}_lte": last_value}
+            continue
+
+        # A whole page shares one value, so the cursor cannot move past it and
+        # the votes of that value are read in an order of their own
+        tied_where = {**where, order_by: last_value}
+        tied_pages = (
+            iterate_votes(proposal_id, "vp", tied_where)
+            if order_by == "created"
+            else iterate_skipped_votes(proposal_id, tied_where)
         )
+        async for tied_votes in tied_pages:
+            new_tied_votes = [
+                vote for vote in tied_votes if vote["id"] not in boundary_ids
+            ]
+            if new_tied_votes:
+                yield new_tied_votes
+        boundary_ids = set()
+        cursor = {f"{order_by}_lt": last_value}
+
+
+async def get_votes(proposal_id: str) -> dict[str, list[dict]]:
+    result: dict[str, list[dict]] = {"votes": []}
+    async for page in iterate_votes(proposal_id):
+        result["votes"].extend(page)
+
     return result
@@ -3,7 +3,12 @@ from gql import gql
 
 
 def proposals(
-    organization_id: str, limit: int, order_direction: str = "desc", skip: int = 0
+    organization_id: str,
+    limit: int,
+    order_direction: str = "desc",
+    skip: int = 0,
+    created_after: int | None = None,
+    proposal_ids: list[str] | None = None,
 ) -> DocumentNode:
     query_params = """proposals(
         first: {limit}
@@ -14,6 +19,9 @@ def proposals(
     )"""
     query_body = """{
         id
+        state
+        created
+        end
         space {
             id
             name
@@ -21,6 +29,14 @@ def proposals(
     }"""
 
     where_clause = 'space: "{organization_id}"'.format(organization_id=organization_id)
+    if created_after is not None:
+        where_clause += ", created_gt: {created_after}".format(
+            created_after=created_after
+        )
+    if proposal_ids is not None:
+        where_clause += ", id_in: {proposal_ids}".format(
+            proposal_ids=proposal_ids
+        ).replace("'", '"')
     where_clause = "".join(["{", where_clause, "}"])
 
     query_params = query_params.format(
@@ -34,11 +50,17 @@ def proposals(
     return gql(query)
 
 
-def votes(proposal_id: str, skip: int) -> DocumentNode:
+def votes(
+    proposal_id: str,
+    where: dict[str, int | float] | None = None,
+    order_by: str = "created",
+    skip: int = 0,
+    first: int = 1000,
+) -> DocumentNode:
     query_params = """votes(
-        first: 1000
+        first: {first}
         skip: {skip_clause}
-        orderBy: "created"
+        orderBy: "{order_by}"
         orderDirection: desc
         where: {where_clause}
     )
@@ -72,9 +94,13 @@ def votes(proposal_id: str, skip: int) -> DocumentNode:
     """
 
     where_clause = 'proposal: "{proposal_id}"'.format(proposal_id=proposal_id)
+    for field, value in (where or dict()).items():
+        where_clause += ", {field}: {value}".format(field=field, value=value)
     where_clause = "".join(["{", where_clause, "}"])
 
-    query_params = query_params.format(where_clause=where_clause, skip_clause=skip)
+    query_params = query_params.format(
+        first=first, where_clause=where_clause, skip_clause=skip, order_by=order_by
+    )
     query = "".join(["query{", query_params, query_body, "}"])
 
     return gql(query)
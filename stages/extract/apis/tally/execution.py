@@ -1,100 +1,160 @@
+from asyncio import gather, Semaphore
 from os import getenv
 
-from gql import dsl, Client
-from gql.transport.aiohttp import AIOHTTPTransport
-from gql.transport.exceptions import TransportServerError
 from dotenv import load_dotenv
+from graphql import DocumentNode
 
+from ..cache import cached
+from ..limits import limited
+from ..sessions import get_graphql_session
 from .queries import organizations, proposals, votes
+from .schema import get_dsl_schema
 
 
 load_dotenv()
 headers = {"Api-key": getenv("TALLY_API")}
-transport = AIOHTTPTransport(
-    url="https://api.tally.xyz/query", headers=headers, timeout=120
-)
+TALLY_URL = "https://api.tally.xyz/query"
+VOTES_PAGE_SIZE = 200
+PROPOSALS_PAGE_SIZE = 150
+ORGANIZATIONS_PER_QUERY = 10
 
-client = Client(transport=transport, fetch_schema_from_transport=True)
 
+async def get_session():
+    return await get_graphql_session(TALLY_URL, headers=headers, timeout=120)
 
-async def get_votes(
-    chain_id: str,
-    proposal_ids: list[str],
-    governance_ids: list[str] = [],
-    upper_limit: int = 200,
-    skip: int = 0,
-) -> dict[str, dict]:
-    session = await client.connect_async(reconnecting=True)
-    query = votes(chain_id, proposal_ids, governance_ids, upper_limit, skip)
 
-    try:
-        response = await session.execute(query)
-    except TransportServerError:
-        await client.close_async()
-        raise
-    await client.close_async()
+async def execute(query: DocumentNode, data_class: str) -> dict:
+    session = await get_session()
 
-    result = {proposal["id"]: proposal for proposal in response["proposals"]}
+    return await cached(
+        "tally",
+        query,
+        lambda: limited("tally", lambda: session.execute(query)),
+        data_class,
+    )
 
-    maybe_next_page = {
-        id: proposal for id, proposal in result.items() if proposal["votes"]
-    }
 
-    if maybe_next_page:
-        maybe_next_page_proposal_ids = list(maybe_next_page.keys())
-        next_page = await get_votes(
-            chain_id,
-            maybe_next_page_proposal_ids,
-            governance_ids,
-            upper_limit,
-            skip + 200,
-        )
-
-        for proposal_id, proposal in next_page.copy().items():
-            if proposal["votes"]:
-                votes_in_next_page = maybe_next_page[proposal_id]["votes"].copy()
+async def get_proposal_votes(
+    chain_id: str,
+    proposal_id: str,
+    governance_ids: list[str],
+    upper_limit: int = VOTES_PAGE_SIZE,
+    closed: bool = False,
+) -> dict | None:
+    data_class = "closed_votes" if closed else "open_votes"
+    proposal: dict | None = None
+    skip = 0
+
+    while True:
+        query = votes(chain_id, [proposal_id], governance_ids, upper_limit, skip)
+        response = await execute(query, data_class)
+        if not response["proposals"]:
+            return proposal
+
+        page: dict = response["proposals"][0]
+        if proposal is None:
+            proposal = page
+        else:
+            proposal["votes"].extend(page["votes"])
+        if len(page["votes"]) < upper_limit:
+            return proposal
+        skip += upper_limit
 
-                votes_in_next_page.extend(proposal["votes"])
-                result[proposal_id]["votes"].extend(votes_in_next_page)
 
-    return result
+async def get_votes(
+    chain_id: str,
+    proposal_ids: list[str],
+    governance_ids: list[str] | None = None,
+    upper_limit: int = VOTES_PAGE_SIZE,
+    concurrency: int = 10,
+    closed_proposal_ids: set[str] | None = None,
+    semaphore: Semaphore | None = None,
+) -> dict[str, dict]:
+    governance_ids = governance_ids or []
+    closed_proposal_ids = closed_proposal_ids or set()
+    semaphore = semaphore or Semaphore(concurrency)
+
+    async def get_bounded_proposal_votes(proposal_id: str) -> dict | None:
+        async with semaphore:
+            return await get_proposal_votes(
+                chain_id,
+                proposal_id,
+                governance_ids,
+                upper_limit,
+                proposal_id in closed_proposal_ids,
+            )
+
+    proposals = await gather(
+        *[get_bounded_proposal_votes(proposal_id) for proposal_id in proposal_ids]
+    )
+
+    return {proposal["id"]: proposal for proposal in proposals if proposal}
+
+
+async def get_batch_proposals(
+    organization_ids: list[str], upper_limit: int = PROPOSALS_PAGE_SIZE
+) -> list[dict]:
+    ds = await get_dsl_schema(get_session)
+    governances: dict[str, dict] = dict()
+    remaining_organization_ids = organization_ids
+    skip = 0
+
+    while remaining_organization_ids:
+        query = proposals(ds, remaining_organization_ids, upper_limit, skip)
+        response = await execute(query, "proposals")
+
+        full_page_organization_ids: list[str] = []
+        for governance in response.get("governances") or []:
+            if governance["id"] in governances:
+                governances[governance["id"]]["proposals"].extend(
+                    governance["proposals"]
+                )
+            else:
+                governances[governance["id"]] = governance
+            if len(governance["proposals"]) == upper_limit:
+                full_page_organization_ids.append(governance["organization"]["id"])
+
+        remaining_organization_ids = list(dict.fromkeys(full_page_organization_ids))
+        skip += upper_limit
+
+    return list(governances.values())
 
 
 async def get_proposals(
     organization_ids: list[str],
-    upper_limit: int = 150,
-    skip: int = 0,
+    upper_limit: int = PROPOSALS_PAGE_SIZE,
+    concurrency: int = 10,
 ) -> dict[str, list[dict]]:
-    session = await client.connect_async(reconnecting=True)
-    ds = dsl.DSLSchema(client.schema)
-    query = proposals(ds, organization_ids[:10], upper_limit, skip)
-    temp_organization_ids = organization_ids
-    del temp_organization_ids[:10]
-
-    response = await session.execute(query)
-
-    await client.close_async()
-
-    if temp_organization_ids:
-        response["governances"].extend(
-            (await get_proposals(temp_organization_ids))["governances"]
-        )
-
-    if not response.get("governances"):
-        return {"governances": []}
-    return response
+    semaphore = Semaphore(concurrency)
+
+    async def get_bounded_batch_proposals(batch: list[str]) -> list[dict]:
+        async with semaphore:
+            return await get_batch_proposals(batch, upper_limit)
+
+    batches = [
+        organization_ids[index : index + ORGANIZATIONS_PER_QUERY]
+        for index in range(0, len(organization_ids), ORGANIZATIONS_PER_QUERY)
+    ]
+    batch_governances = await gather(
+        *[get_bounded_batch_proposals(batch) for batch in batches]
+    )
+
+    return {
+        "governances": [
+            governance
+            for governances in batch_governances
+            for governance in governances
+        ]
+    }
 
 
 async def get_organizations(
     organization_names: list[str], upper_limit: int = None, skip: int = 0
 ) -> dict[str, list[dict]]:
-    session = await client.connect_async(reconnecting=True)
-    ds = dsl.DSLSchema(client.schema)
+    ds = await get_dsl_schema(get_session)
     query = organizations(ds, organization_names, upper_limit, skip)
 
-    response = await session.execute(query)
-
-    await client.close_async()
+    response = await execute(query, "organizations")
 
     if not response.get("organizations"):
         return {"organizations": []}
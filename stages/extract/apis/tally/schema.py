@@ -0,0 +1,102 @@
+from asyncio import Lock
+from json import dump, load
+from os import replace
+from pathlib import Path
+from time import time
+from typing import Awaitable, Callable
+
+from gql import dsl, gql
+from gql.client import AsyncClientSession
+from graphql import build_client_schema, get_introspection_query, version
+
+from ..cache import CACHE_DIRECTORY
+from ..limits import limited
+
+
+SCHEMA_CACHE_VERSION = f"1-graphql-{version}"
+SCHEMA_TTL = 7 * 24 * 60 * 60
+SCHEMA_CACHE_PATH = CACHE_DIRECTORY / "tally_schema.json"
+
+_dsl_schema: dsl.DSLSchema | None = None
+_lock: Lock | None = None
+
+
+def load_introspection(
+    path: Path = SCHEMA_CACHE_PATH, ttl: float | None = SCHEMA_TTL
+) -> dict | None:
+    try:
+        with open(path) as cache_file:
+            cached: dict = load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if cached.get("version") != SCHEMA_CACHE_VERSION:
+        return None
+    if ttl is not None and time() - cached.get("fetched_at", 0) > ttl:
+        return None
+    return cached.get("introspection")
+
+
+def save_introspection(introspection: dict, path: Path = SCHEMA_CACHE_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_suffix(".tmp")
+    with open(temporary_path, "w") as cache_file:
+        dump(
+            {
+                "version": SCHEMA_CACHE_VERSION,
+                "fetched_at": time(),
+                "introspection": introspection,
+            },
+            cache_file,
+        )
+    replace(temporary_path, path)
+
+
+def load_dsl_schema(
+    path: Path = SCHEMA_CACHE_PATH, ttl: float | None = SCHEMA_TTL
+) -> dsl.DSLSchema | None:
+    introspection = load_introspection(path, ttl)
+    if not introspection:
+        return None
+    return dsl.DSLSchema(build_client_schema(introspection))
+
+
+async def fetch_introspection(
+    session: AsyncClientSession, path: Path = SCHEMA_CACHE_PATH
+) -> dict:
+    query = gql(get_introspection_query())
+    try:
+        introspection = await limited("tally", lambda: session.execute(query))
+    except Exception:
+        maybe_stale_introspection = load_introspection(path, ttl=None)
+        if not maybe_stale_introspection:
+            raise
+        print("[warning] Using stale Tally schema cache")
+        return maybe_stale_introspection
+
+    save_introspection(introspection, path)
+    return introspection
+
+
+async def get_dsl_schema(
+    get_session: Callable[[], Awaitable[AsyncClientSession]],
+    path: Path = SCHEMA_CACHE_PATH,
+) -> dsl.DSLSchema:
+    global _dsl_schema, _lock
+
+    if _dsl_schema is not None:
+        return _dsl_schema
+    if _lock is None:
+        _lock = Lock()
+
+    async with _lock:
+        if _dsl_schema is None:
+            # The queries are built offline from the cache, Tally is only
+            # introspected when there is no fresh one
+            _dsl_schema = load_dsl_schema(path) or dsl.DSLSchema(
+                build_client_schema(
+                    await fetch_introspection(await get_session(), path)
+                )
+            )
+
+    return _dsl_schema
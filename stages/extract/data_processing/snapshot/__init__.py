@@ -1,20 +1,27 @@
 from ...apis.snapshot.execution import get_votes
+from ...datatypes import StoredProposal
 
 
-def sanitize_vote(vote: dict, dao_id: str) -> dict:
+def sanitize_proposal(proposal: dict, dao_id: str) -> dict:
+    return {
+        "proposal_id": proposal["id"],
+        "proposal_title": proposal["title"],
+        "proposal_created": proposal["created"],
+        "proposal_start": proposal["start"],
+        "proposal_end": proposal["end"],
+        "proposal_scores_total": proposal["scores_total"],
+        "proposal_state": proposal["state"],
+        "proposal_organization_name": proposal["space"]["name"],
+        "proposal_type": proposal["type"],
+        "proposal_scores": proposal["scores"],
+        "proposal_choices": proposal["choices"],
+        "organization_id": dao_id,
+        "proposal_organization_id": proposal["space"]["id"],
+    }
+
+
+def sanitize_vote(vote: dict) -> dict:
     vote["proposal_id"] = vote["proposal"]["id"]
-    vote["proposal_title"] = vote["proposal"]["title"]
-    vote["proposal_created"] = vote["proposal"]["created"]
-    vote["proposal_start"] = vote["proposal"]["start"]
-    vote["proposal_end"] = vote["proposal"]["end"]
-    vote["proposal_scores_total"] = vote["proposal"]["scores_total"]
-    vote["proposal_state"] = vote["proposal"]["state"]
-    vote["proposal_organization_name"] = vote["proposal"]["space"]["name"]
-    vote["proposal_type"] = vote["proposal"]["type"]
-    vote["proposal_scores"] = vote["proposal"]["scores"]
-    vote["proposal_choices"] = vote["proposal"]["choices"]
-    vote["organization_id"] = dao_id
-    vote["proposal_organization_id"] = vote["proposal"]["space"]["id"]
     vote.pop("proposal")
 
     return vote
@@ -40,9 +47,23 @@ async def get_proposal_payload(proposal: dict, dao_metadata: dict) -> dict:
         return {}
 
     payload[proposal_id]["proposal"] = proposal
+    payload[proposal_id]["proposal_row"] = sanitize_proposal(
+        votes[0]["proposal"], dao_id
+    )
 
     for vote_index, vote in enumerate(votes.copy()):
-        votes[vote_index] = sanitize_vote(vote, dao_id)
+        votes[vote_index] = sanitize_vote(vote)
 
     payload[proposal_id].update({"votes": votes.copy()})
     return payload
+
+
+def get_stored_proposal(proposal: dict, payload: dict) -> StoredProposal:
+    return StoredProposal(
+        proposal["id"],
+        proposal["state"],
+        proposal["created"],
+        proposal["end"],
+        sum(len(proposal_payload["votes"]) for proposal_payload in payload.values()),
+        payload,
+    )
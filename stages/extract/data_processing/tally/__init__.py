@@ -3,6 +3,8 @@ from zoneinfo import ZoneInfo
 
 from dateutil import parser
 
+from ...datatypes import StoredProposal
+
 
 def get_proposal_state(proposal: dict) -> str:
     now = datetime.now(ZoneInfo("UTC"))
@@ -18,27 +20,33 @@ def get_proposal_state(proposal: dict) -> str:
     )
 
 
-def sanitize_vote(vote: dict, proposal: dict, dao_id: str):
+def sanitize_proposal(proposal: dict, dao_id: str) -> dict:
+    return {
+        "proposal_id": proposal["id"],
+        "proposal_title": proposal["title"],
+        "proposal_created": proposal["start"],
+        "proposal_start": proposal["start"]["timestamp"],
+        "proposal_end": proposal["end"]["timestamp"],
+        "proposal_scores_total": sum(
+            [int(choice["weight"]) for choice in proposal["voteStats"]]
+        ),
+        "proposal_state": get_proposal_state(proposal),
+        "proposal_organization_name": proposal["organization_name"],
+        "proposal_type": "single-choice",
+        "proposal_scores": [int(stat["weight"]) for stat in proposal["voteStats"]],
+        "proposal_choices": [stat["support"] for stat in proposal["voteStats"]],
+        "proposal_organization_id": dao_id,
+    }
+
+
+def sanitize_vote(vote: dict, proposal_row: dict):
     try:
         vote["vp"] = int(vote["weight"])
     except KeyError:
         return
-    vote["proposal_id"] = proposal["id"]
-    vote["proposal_title"] = proposal["title"]
-    vote["proposal_created"] = proposal["start"]
-    vote["proposal_start"] = proposal["start"]["timestamp"]
-    vote["proposal_end"] = proposal["end"]["timestamp"]
-    vote["proposal_scores_total"] = sum(
-        [int(choice["weight"]) for choice in proposal["voteStats"]]
-    )
-    vote["proposal_state"] = get_proposal_state(proposal)
-    vote["proposal_organization_name"] = proposal["organization_name"]
-    vote["proposal_type"] = "single-choice"
-    vote["proposal_scores"] = [int(stat["weight"]) for stat in proposal["voteStats"]]
-    vote["proposal_choices"] = [stat["support"] for stat in proposal["voteStats"]]
-    vote["proposal_organization_id"] = dao_id
+    vote["proposal_id"] = proposal_row["proposal_id"]
     vote["created"] = vote["transaction"]["block"]["timestamp"]
-    vote["choice"] = vote["proposal_choices"].index(vote["support"]) + 1
+    vote["choice"] = proposal_row["proposal_choices"].index(vote["support"]) + 1
     vote["voter_ens"] = vote["voter"]["ens"]
     vote["voter"] = vote["voter"]["address"]
     vote.pop("weight")
@@ -70,9 +78,31 @@ async def get_proposal_payload(proposal: dict, governance_metadata: dict) -> dic
         return {}
 
     payload[proposal_id]["proposal"] = proposal
+    proposal_row = sanitize_proposal(proposal, dao_tally_id)
+    payload[proposal_id]["proposal_row"] = proposal_row
 
     for vote_index, vote in enumerate(votes.copy()):
-        votes[vote_index] = sanitize_vote(vote, proposal, dao_tally_id)
+        votes[vote_index] = sanitize_vote(vote, proposal_row)
 
     payload[proposal_id].update({"votes": votes})
     return payload
+
+
+def get_stored_proposal(proposal: dict, payload: dict) -> StoredProposal:
+    return StoredProposal(
+        str(proposal["id"]),
+        get_proposal_state(proposal),
+        int(parser.parse(proposal["start"]["timestamp"]).timestamp()),
+        int(parser.parse(proposal["end"]["timestamp"]).timestamp()),
+        sum(len(proposal_payload["votes"]) for proposal_payload in payload.values()),
+        {
+            proposal_id: {
+                "proposal": {
+                    k: v for k, v in proposal_payload["proposal"].items() if k != "votes"
+                },
+                "proposal_row": proposal_payload["proposal_row"],
+                "votes": proposal_payload["votes"],
+            }
+            for proposal_id, proposal_payload in payload.items()
+        },
+    )
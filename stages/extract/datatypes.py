@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -9,3 +9,18 @@ class Request:
     proposal_limit: int = None
     use_tally: bool = False
     blacklist: list[str] = None
+    concurrency: int = 10
+    dao_concurrency: int = 4
+    use_cache: bool = True
+    incremental: bool = False
+    snapshot_rate: float = 1.0
+
+
+@dataclass
+class StoredProposal:
+    proposal_id: str
+    proposal_state: str
+    created: int
+    end: int
+    vote_count: int
+    payload: dict[str, dict] = field(default_factory=dict)
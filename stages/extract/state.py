@@ -0,0 +1,182 @@
+import sqlite3
+from contextlib import contextmanager
+from json import dumps, loads
+from pathlib import Path
+from typing import Iterator
+from zlib import compress, decompress
+
+from .apis.cache import CACHE_DIRECTORY
+from .datatypes import StoredProposal
+
+
+STATE_PATH = CACHE_DIRECTORY / "state.sqlite"
+OPEN_STATES = ("active", "pending")
+
+
+class StateStore:
+    def __init__(self, path: Path = STATE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS proposals (
+                source TEXT NOT NULL,
+                dao_id TEXT NOT NULL,
+                proposal_id TEXT NOT NULL,
+                proposal_state TEXT NOT NULL,
+                created INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                vote_count INTEGER NOT NULL,
+                payload BLOB,
+                PRIMARY KEY (source, dao_id, proposal_id)
+            );
+            """
+        )
+
+    def load(
+        self, source: str, dao_id: str, with_payloads: bool = True
+    ) -> dict[str, StoredProposal]:
+        rows = self.connection.execute(
+            f"""
+            SELECT proposal_id, proposal_state, created, end, vote_count,
+                {"payload" if with_payloads else "NULL"}
+            FROM proposals WHERE source = ? AND dao_id = ?
+            """,
+            (source, dao_id),
+        )
+        return {
+            proposal_id: StoredProposal(
+                proposal_id,
+                proposal_state,
+                created,
+                end,
+                vote_count,
+                loads(decompress(payload)) if payload else {},
+            )
+            for proposal_id, proposal_state, created, end, vote_count, payload in rows
+        }
+
+    def load_payload(self, source: str, dao_id: str, proposal_id: str) -> dict:
+        row = self.connection.execute(
+            """
+            SELECT payload FROM proposals
+            WHERE source = ? AND dao_id = ? AND proposal_id = ?
+            """,
+            (source, dao_id, proposal_id),
+        ).fetchone()
+        return loads(decompress(row[0])) if row and row[0] else {}
+
+    def save(self, source: str, dao_id: str, proposals: list[StoredProposal]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO proposals VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        source,
+                        dao_id,
+                        proposal.proposal_id,
+                        proposal.proposal_state,
+                        proposal.created,
+                        proposal.end,
+                        proposal.vote_count,
+                        compress(dumps(proposal.payload).encode())
+                        if proposal.payload
+                        else None,
+                    )
+                    for proposal in proposals
+                ],
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+_store: StateStore | None = None
+
+
+@contextmanager
+def extraction_state(
+    enabled: bool = True, path: Path = STATE_PATH
+) -> Iterator[StateStore | None]:
+    global _store
+
+    _store = StateStore(path) if enabled else None
+    try:
+        yield _store
+    finally:
+        if _store:
+            _store.close()
+        _store = None
+
+
+def get_store() -> StateStore | None:
+    return _store
+
+
+def get_watermark(stored_proposals: dict[str, StoredProposal]) -> int | None:
+    if not stored_proposals:
+        return None
+    return max(proposal.created for proposal in stored_proposals.values())
+
+
+def get_open_proposal_ids(stored_proposals: dict[str, StoredProposal]) -> list[str]:
+    return [
+        proposal_id
+        for proposal_id, proposal in stored_proposals.items()
+        if proposal.proposal_state in OPEN_STATES
+    ]
+
+
+def get_latest_proposals(
+    proposals: list[StoredProposal], proposal_limit: int | None = None
+) -> list[StoredProposal]:
+    latest_proposals = sorted(
+        proposals, key=lambda proposal: proposal.created, reverse=True
+    )
+    if proposal_limit:
+        latest_proposals = latest_proposals[:proposal_limit]
+    return latest_proposals
+
+
+def iterate_stored_payloads(
+    source: str,
+    dao_id: str,
+    stored_proposals: dict[str, StoredProposal],
+    fetched_proposal_ids: set[str],
+    proposal_limit: int | None = None,
+) -> Iterator[dict[str, dict]]:
+    remaining_proposals = [
+        proposal
+        for proposal_id, proposal in stored_proposals.items()
+        if proposal_id not in fetched_proposal_ids
+    ]
+    if proposal_limit:
+        proposal_limit -= len(fetched_proposal_ids)
+        if proposal_limit <= 0:
+            return
+
+    for proposal in get_latest_proposals(remaining_proposals, proposal_limit):
+        payload = proposal.payload
+        if not payload and _store:
+            payload = _store.load_payload(source, dao_id, proposal.proposal_id)
+        if payload:
+            yield payload
+
+
+def merge_payloads(
+    stored_proposals: dict[str, StoredProposal],
+    new_proposals: list[StoredProposal],
+    proposal_limit: int | None = None,
+) -> dict[str, dict]:
+    merged_proposals = stored_proposals | {
+        proposal.proposal_id: proposal for proposal in new_proposals
+    }
+    latest_proposals = get_latest_proposals(
+        list(merged_proposals.values()), proposal_limit
+    )
+
+    dao_proposals: dict[str, dict] = dict()
+    for proposal in latest_proposals:
+        dao_proposals.update(proposal.payload)
+    return dao_proposals
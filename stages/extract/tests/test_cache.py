@@ -0,0 +1,66 @@
+from asyncio import run
+
+import pytest
+from gql import gql
+
+from stages.extract.apis import cache
+
+
+@pytest.fixture
+def response_cache(tmp_path):
+    with cache.response_cache(path=tmp_path / "responses.sqlite") as response_cache:
+        yield response_cache
+
+
+def test_get_key_ignores_query_formatting():
+    compact_query = gql('{ votes(where: {proposal: "0x1"}) { id } }')
+    spaced_query = gql("""
+        query {
+            votes(where: { proposal: "0x1" }) {
+                id
+            }
+        }
+        """)
+
+    assert cache.get_key("snapshot", compact_query) == cache.get_key(
+        "snapshot", spaced_query
+    )
+    assert cache.get_key("snapshot", compact_query) != cache.get_key(
+        "tally", compact_query
+    )
+
+
+def test_cached_reuses_responses(response_cache):
+    calls = []
+
+    async def request() -> dict:
+        calls.append(1)
+        return {"votes": [{"id": "1"}]}
+
+    for _ in range(3):
+        result = run(cache.cached("snapshot", "{ votes }", request, "closed_votes"))
+
+    assert result == {"votes": [{"id": "1"}]}
+    assert len(calls) == 1
+
+
+def test_expired_responses_are_dropped(response_cache):
+    response_cache.put("open", {"votes": []}, ttl=-1)
+    response_cache.put("closed", {"votes": []}, ttl=None)
+
+    assert response_cache.get("open") is None
+    assert response_cache.get("closed") == {"votes": []}
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    response_cache = cache.ResponseCache(tmp_path / "responses.sqlite")
+    for key in ["a", "b", "c"]:
+        response_cache.put(key, {"data": key * 1000}, ttl=None)
+    response_cache.get("a")
+
+    response_cache.max_bytes = response_cache.size - 1
+    response_cache.evict()
+
+    assert response_cache.get("b") is None
+    assert response_cache.get("a") and response_cache.get("c")
+    response_cache.close()
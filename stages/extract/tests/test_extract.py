@@ -0,0 +1,242 @@
+from asyncio import run, sleep
+
+import pytest
+from httpx import HTTPStatusError, Request, Response
+
+from stages import extract
+from stages.extract import (
+    get_first_valid_daos,
+    get_valid_proposal_payloads,
+    stream_first_valid_daos,
+)
+
+
+@pytest.fixture
+def raw_proposals() -> list[dict]:
+    return [{"id": str(proposal_id)} for proposal_id in range(6)]
+
+
+async def delayed_payload(proposal: dict, dao_metadata: dict) -> dict:
+    proposal_id = int(proposal["id"])
+    await sleep((6 - proposal_id) / 100)
+    if proposal_id == 3:
+        raise RuntimeError("hub unavailable")
+    return {proposal["id"]: dao_metadata}
+
+
+async def collect(raw_proposals: list[dict], concurrency: int) -> list[dict | None]:
+    return [
+        maybe_payload
+        async for maybe_payload in get_valid_proposal_payloads(
+            delayed_payload, raw_proposals, {"id": "orgID"}, concurrency
+        )
+    ]
+
+
+@pytest.mark.parametrize("concurrency", [1, 2, 10])
+def test_get_valid_proposal_payloads_keeps_order(concurrency, raw_proposals):
+    payloads = run(collect(raw_proposals, concurrency))
+
+    assert [list(payload)[0] for payload in payloads if payload] == [
+        "0",
+        "1",
+        "2",
+        "4",
+        "5",
+    ]
+    assert payloads[3] is None
+
+
+async def delayed_dao(raw_dao: dict) -> dict:
+    await sleep(raw_dao["delay"])
+    if raw_dao["daoName"] == "BrokenDAO":
+        raise RuntimeError("deepdao unavailable")
+    return {raw_dao["daoName"]: {}} if raw_dao["valid"] else {}
+
+
+@pytest.fixture
+def ranked_raw_daos() -> list[dict]:
+    return [
+        {"daoName": "SlowDAO", "delay": 0.05, "valid": True},
+        {"daoName": "EmptyDAO", "delay": 0.01, "valid": False},
+        {"daoName": "BrokenDAO", "delay": 0.01, "valid": True},
+        {"daoName": "FastDAO", "delay": 0.0, "valid": True},
+        {"daoName": "LateDAO", "delay": 0.02, "valid": True},
+        {"daoName": "NeverDAO", "delay": 10, "valid": True},
+    ]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 6])
+def test_get_first_valid_daos_keeps_ranking(concurrency, ranked_raw_daos):
+    daos = run(get_first_valid_daos(delayed_dao, ranked_raw_daos, 3, concurrency))
+
+    assert [list(dao)[0] for dao in daos] == ["SlowDAO", "FastDAO", "LateDAO"]
+
+
+async def delayed_dao_stream(raw_dao: dict):
+    dao_data = await delayed_dao(raw_dao)
+    for proposal_index in range(3 if dao_data else 0):
+        await sleep(0)
+        yield {f"{raw_dao['daoName']}-{proposal_index}": {}}
+
+
+async def collect_stream(ranked_raw_daos: list[dict], concurrency: int) -> list[str]:
+    return [
+        list(proposal_payload)[0]
+        async for proposal_payload in stream_first_valid_daos(
+            delayed_dao_stream, ranked_raw_daos, 3, concurrency, buffer_size=1
+        )
+    ]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3, 6])
+def test_stream_first_valid_daos_keeps_ranking(concurrency, ranked_raw_daos):
+    proposal_ids = run(collect_stream(ranked_raw_daos, concurrency))
+
+    assert proposal_ids == [
+        f"{dao_name}-{proposal_index}"
+        for dao_name in ["SlowDAO", "FastDAO", "LateDAO"]
+        for proposal_index in range(3)
+    ]
+
+
+def test_stream_first_valid_daos_buffers_a_bounded_number_of_proposals():
+    produced: list[str] = []
+
+    async def endless_dao_stream(raw_dao: dict):
+        proposal_index = 0
+        while True:
+            produced.append(raw_dao["daoName"])
+            yield {f"{raw_dao['daoName']}-{proposal_index}": {}}
+            proposal_index += 1
+
+    async def take_first_proposals() -> list[str]:
+        proposal_payloads = stream_first_valid_daos(
+            endless_dao_stream,
+            [{"daoName": "FirstDAO"}, {"daoName": "SecondDAO"}],
+            2,
+            2,
+            buffer_size=2,
+        )
+        proposal_ids = []
+        async for proposal_payload in proposal_payloads:
+            proposal_ids.append(list(proposal_payload)[0])
+            if len(proposal_ids) == 20:
+                break
+        await proposal_payloads.aclose()
+        return proposal_ids
+
+    proposal_ids = run(take_first_proposals())
+
+    assert proposal_ids == [f"FirstDAO-{index}" for index in range(20)]
+    assert produced.count("SecondDAO") <= 3
+
+
+def test_get_token_addresses_skips_invalid_addresses(monkeypatch, capsys):
+    token_metadata = {
+        "uni": {"tokenAddress": "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984"},
+        "none": None,
+        "bad": {"tokenAddress": "0xnotanaddress"},
+        "ens": {"tokenAddress": "0xc18360217d8f7ab5e7c516566761ea12ce7f9d72"},
+        "gone": None,
+    }
+
+    async def get_raw_token_metadata(organization_id: str) -> dict | None:
+        await sleep(0.01 if organization_id == "uni" else 0)
+        if organization_id == "gone":
+            request = Request("GET", "https://deepdao-server.deepdao.io/")
+            raise HTTPStatusError(
+                "Not Found", request=request, response=Response(404, request=request)
+            )
+        return token_metadata[organization_id]
+
+    monkeypatch.setattr(extract, "get_raw_token_metadata", get_raw_token_metadata)
+    raw_daos = [
+        {"organizationId": organization_id} for organization_id in token_metadata
+    ]
+
+    token_addresses = run(extract.get_token_addresses(raw_daos, 2))
+
+    assert token_addresses == [
+        "0x1f9840a85d5aF5bf1D1762F925BDADdC4201F984",
+        "0xC18360217D8F7Ab5e7c516566761Ea12Ce7F9D72",
+    ]
+    output = capsys.readouterr().out
+    assert "[warning] Converting 0xnotanaddress to checksum" in output
+    assert "[warning] Skipping the token of gone" in output
+
+
+def test_map_bounded_keeps_order_and_limit():
+    in_flight = []
+    running = 0
+
+    async def delayed_double(value: int) -> int:
+        nonlocal running
+        running += 1
+        in_flight.append(running)
+        await sleep((6 - value) / 100)
+        running -= 1
+        return 2 * value
+
+    assert run(extract.map_bounded(delayed_double, list(range(6)), 2)) == [
+        0,
+        2,
+        4,
+        6,
+        8,
+        10,
+    ]
+    assert max(in_flight) == 2
+
+
+def test_get_all_daos_tally_shares_the_request_limit(monkeypatch):
+    governances = [
+        {
+            "id": f"gov-{governance_index}",
+            "chainId": "eip155:1",
+            "organization": {"name": f"DAO {governance_index}"},
+            "proposals": [
+                {
+                    "id": f"{governance_index}-{proposal_index}",
+                    "start": {"timestamp": "2023-01-01T00:00:00Z"},
+                    "end": {"timestamp": "2023-01-08T00:00:00Z"},
+                }
+                for proposal_index in range(5)
+            ],
+        }
+        for governance_index in range(6)
+    ]
+    in_flight = []
+    running = 0
+
+    async def get_tally_governances(raw_daos, concurrency):
+        return {"governances": governances}
+
+    async def get_votes(
+        chain_id, proposal_ids, governance_ids, concurrency, semaphore, **_
+    ):
+        async def get_proposal_votes(proposal_id: str) -> dict:
+            nonlocal running
+            async with semaphore:
+                running += 1
+                in_flight.append(running)
+                await sleep(0.001)
+                running -= 1
+            return {"id": proposal_id, "votes": []}
+
+        return {
+            proposal_id: await get_proposal_votes(proposal_id)
+            for proposal_id in proposal_ids
+        }
+
+    async def get_governance_proposals(proposals, governance_metadata, stored):
+        return {governance_metadata["id"]: len(proposals)}
+
+    monkeypatch.setattr(extract, "get_tally_governances", get_tally_governances)
+    monkeypatch.setattr(extract, "get_votes", get_votes)
+    monkeypatch.setattr(extract, "get_governance_proposals", get_governance_proposals)
+
+    assert run(extract.get_all_daos_tally([], concurrency=2)) == [
+        {f"gov-{governance_index}": 5} for governance_index in range(6)
+    ]
+    assert max(in_flight) == 2
@@ -0,0 +1,93 @@
+from asyncio import run
+
+import pytest
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+from httpx import HTTPStatusError, Request, Response
+
+from stages.extract.apis import limits
+
+
+@pytest.fixture(autouse=True)
+def no_waiting(monkeypatch):
+    async def sleep(delay: float):
+        assert delay >= 0
+
+    monkeypatch.setattr(limits, "sleep", sleep)
+    monkeypatch.setattr(limits, "buckets", dict())
+    monkeypatch.setattr(limits, "retry_counts", limits.Counter())
+
+
+def flaky_request(errors: list[Exception]):
+    async def request() -> str:
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return request
+
+
+def test_limited_retries_until_success():
+    errors = [TransportServerError("busy", 503), TransportServerError("slow", 429)]
+
+    assert run(limits.limited("snapshot", flaky_request(errors))) == "ok"
+    assert limits.report() == ["snapshot: 2 retries (1 throttled), 0 failures"]
+
+
+def test_limited_gives_up_after_max_attempts():
+    errors = [
+        TransportServerError("busy", 503)
+        for _ in range(limits.RETRY_POLICY.max_attempts)
+    ]
+
+    with pytest.raises(TransportServerError):
+        run(limits.limited("tally", flaky_request(errors)))
+    assert limits.retry_counts[("tally", "failures")] == 1
+
+
+def test_limited_does_not_retry_query_errors():
+    errors = [TransportQueryError("bad query")]
+
+    with pytest.raises(TransportQueryError):
+        run(limits.limited("tally", flaky_request(errors)))
+    assert limits.retry_counts[("tally", "retries")] == 0
+
+
+def test_retry_after_header_is_used():
+    response = Response(
+        429, headers={"Retry-After": "7"}, request=Request("GET", "https://x.io")
+    )
+    error = HTTPStatusError("slow", request=response.request, response=response)
+
+    assert limits.get_retry_after(error) == 7
+    assert limits.RETRY_POLICY.get_delay(0, limits.get_retry_after(error)) == 7
+
+
+@pytest.mark.parametrize("attempt", range(8))
+def test_backoff_is_bounded(attempt):
+    delay = limits.RETRY_POLICY.get_delay(attempt)
+
+    assert (
+        0
+        <= delay
+        <= min(
+            limits.RETRY_POLICY.max_delay, limits.RETRY_POLICY.base_delay * 2**attempt
+        )
+    )
+
+
+def test_token_bucket_spaces_out_bursts():
+    bucket = limits.TokenBucket(rate=2.0, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.5, abs=0.01)
+    assert waits[3] == pytest.approx(1.0, abs=0.01)
+
+
+def test_rate_limits_overrides_the_endpoint_rate():
+    with limits.rate_limits({"snapshot": 5.0}):
+        bucket = limits.get_bucket("snapshot")
+        assert bucket.rate == 5.0
+        assert bucket.capacity == limits.ENDPOINT_LIMITS["snapshot"][1]
+
+    assert limits.get_bucket("snapshot").rate == limits.ENDPOINT_LIMITS["snapshot"][0]
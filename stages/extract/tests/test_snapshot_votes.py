@@ -0,0 +1,135 @@
+from asyncio import run
+from random import Random
+
+import pytest
+
+from stages.extract.apis.snapshot import execution
+
+
+def make_votes(created: list[int], vp: list[float] | None = None) -> list[dict]:
+    return sorted(
+        [
+            {"id": f"vote-{vote_index}", "created": vote_created, "vp": vote_vp}
+            for vote_index, (vote_created, vote_vp) in enumerate(
+                zip(created, vp or [1.0] * len(created))
+            )
+        ],
+        key=lambda vote: vote["created"],
+        reverse=True,
+    )
+
+
+@pytest.fixture
+def hub_votes() -> list[dict]:
+    return make_votes(
+        [1000 + vote_index // 7 for vote_index in range(900)] + [2000] * 120
+    )
+
+
+def matches(vote: dict, where: dict) -> bool:
+    for field, value in where.items():
+        name, _, operator = field.partition("_")
+        if operator == "lt" and not vote[name] < value:
+            return False
+        if operator == "lte" and not vote[name] <= value:
+            return False
+        if not operator and vote[name] != value:
+            return False
+    return True
+
+
+def use_fake_hub(monkeypatch, hub_votes: list[dict], shuffle_ties: bool = False):
+    requests = []
+    random = Random(0)
+
+    def votes(proposal_id, where=None, order_by="created", skip=0, first=1000):
+        return where or dict(), order_by, skip, first
+
+    async def try_result(query, data_class):
+        requests.append(query)
+        where, order_by, skip, first = query
+        assert skip <= execution.MAX_VOTES_SKIP
+        matching_votes = sorted(
+            [vote for vote in hub_votes if matches(vote, where)],
+            # Votes of the same value come back in any order
+            key=lambda vote: (
+                -vote[order_by],
+                random.random() if shuffle_ties else 0,
+            ),
+        )
+        return {"votes": matching_votes[skip : skip + first]}
+
+    monkeypatch.setattr(execution, "VOTES_PAGE_SIZE", 50)
+    monkeypatch.setattr(execution, "MAX_VOTES_SKIP", 100)
+    monkeypatch.setattr(execution, "votes", votes)
+    monkeypatch.setattr(execution, "try_result", try_result)
+    return requests
+
+
+def assert_every_vote_once(result: dict, hub_votes: list[dict]):
+    vote_ids = [vote["id"] for vote in result["votes"]]
+    assert len(vote_ids) == len(set(vote_ids))
+    assert set(vote_ids) == {vote["id"] for vote in hub_votes}
+    assert [vote["created"] for vote in result["votes"]] == sorted(
+        [vote["created"] for vote in hub_votes], reverse=True
+    )
+
+
+def test_get_votes_fetches_every_vote_once(monkeypatch, hub_votes):
+    use_fake_hub(monkeypatch, hub_votes)
+    result = run(execution.get_votes("proposal"))
+
+    assert [vote["id"] for vote in result["votes"]] == [
+        vote["id"] for vote in hub_votes
+    ]
+
+
+def test_get_votes_only_pages_ties_that_fill_a_page(monkeypatch):
+    hub_votes = make_votes([1000 + vote_index // 7 for vote_index in range(900)])
+    requests = use_fake_hub(monkeypatch, hub_votes, shuffle_ties=True)
+    result = run(execution.get_votes("proposal"))
+
+    assert_every_vote_once(result, hub_votes)
+    # Each page moves the cursor back by at most the last timestamp's votes
+    assert len(requests) <= len(hub_votes) // (50 - 7) + 1
+    assert all(
+        order_by == "created" and skip == 0 and "created" not in where
+        for where, order_by, skip, _ in requests
+    )
+
+
+def test_get_votes_keeps_ties_the_hub_returns_in_any_order(monkeypatch):
+    hub_votes = make_votes(
+        [3000] * 30 + [2000] * 180 + [1000] * 130 + [500] * 10,
+        [float(vote_index % 97) for vote_index in range(350)],
+    )
+    requests = use_fake_hub(monkeypatch, hub_votes, shuffle_ties=True)
+    result = run(execution.get_votes("proposal"))
+
+    assert_every_vote_once(result, hub_votes)
+    cursors = [where for where, order_by, _, _ in requests if order_by == "created"]
+    assert cursors == [
+        dict(),
+        {"created_lte": 2000},
+        {"created_lt": 2000},
+        {"created_lt": 1000},
+    ]
+
+
+def test_get_votes_reads_ties_deeper_than_skip_reaches(monkeypatch):
+    hub_votes = make_votes(
+        [1000] * 400, [float(vote_index // 3) for vote_index in range(400)]
+    )
+    use_fake_hub(monkeypatch, hub_votes, shuffle_ties=True)
+    result = run(execution.get_votes("proposal"))
+
+    assert_every_vote_once(result, hub_votes)
+
+
+def test_get_votes_skips_through_votes_sharing_every_field(monkeypatch):
+    hub_votes = make_votes([1000] * 120)
+    requests = use_fake_hub(monkeypatch, hub_votes)
+    result = run(execution.get_votes("proposal"))
+
+    assert_every_vote_once(result, hub_votes)
+    assert [skip for _, _, skip, _ in requests if skip] == [50, 100]
@@ -0,0 +1,80 @@
+from asyncio import run
+
+import pytest
+
+from stages import extract
+from stages.extract import state
+from stages.extract.datatypes import StoredProposal
+
+
+def stored_proposal(proposal_id: str, proposal_state: str, created: int):
+    return StoredProposal(
+        proposal_id,
+        proposal_state,
+        created,
+        created + 10,
+        1,
+        {proposal_id: {"proposal": {"id": proposal_id}, "votes": [{"id": "v"}]}},
+    )
+
+
+@pytest.fixture
+def stored_proposals() -> dict[str, StoredProposal]:
+    return {
+        "old": stored_proposal("old", "closed", 100),
+        "open": stored_proposal("open", "active", 200),
+    }
+
+
+def test_store_round_trip(tmp_path, stored_proposals):
+    with state.extraction_state(path=tmp_path / "state.sqlite") as store:
+        store.save("snapshot", "ens.eth", list(stored_proposals.values()))
+
+        assert store.load("snapshot", "ens.eth") == stored_proposals
+        assert store.load("tally", "ens.eth") == {}
+
+
+def test_stored_payloads_are_loaded_lazily(tmp_path, stored_proposals):
+    stored_proposals["older"] = stored_proposal("older", "closed", 50)
+    with state.extraction_state(path=tmp_path / "state.sqlite") as store:
+        store.save("snapshot", "ens.eth", list(stored_proposals.values()))
+        lazy_proposals = store.load("snapshot", "ens.eth", with_payloads=False)
+
+        assert all(not proposal.payload for proposal in lazy_proposals.values())
+        assert list(
+            state.iterate_stored_payloads(
+                "snapshot", "ens.eth", lazy_proposals, {"open"}, 2
+            )
+        ) == [stored_proposals["old"].payload]
+
+
+def test_merge_payloads_prefers_new_proposals(stored_proposals):
+    refreshed = stored_proposal("open", "closed", 200)
+    refreshed.payload["open"]["votes"].append({"id": "w"})
+    new = stored_proposal("new", "pending", 300)
+
+    merged = state.merge_payloads(stored_proposals, [refreshed, new], 2)
+
+    assert list(merged) == ["new", "open"]
+    assert len(merged["open"]["votes"]) == 2
+
+
+def test_only_new_and_open_proposals_are_fetched(monkeypatch, stored_proposals):
+    requests = []
+
+    async def get_snapshot_proposals(
+        dao_snapshot_id, upper_limit=0, created_after=None, proposal_ids=None
+    ):
+        requests.append((created_after, proposal_ids))
+        if proposal_ids:
+            return {"proposals": [{"id": "open"}]}
+        return {"proposals": [{"id": "new"}]}
+
+    monkeypatch.setattr(extract, "get_snapshot_proposals", get_snapshot_proposals)
+
+    raw_proposals = run(
+        extract.get_snapshot_proposals_to_fetch("ens.eth", 150, stored_proposals)
+    )
+
+    assert [proposal["id"] for proposal in raw_proposals] == ["new", "open"]
+    assert requests == [(200, None), (None, ["open"])]
@@ -0,0 +1,112 @@
+from asyncio import run
+
+import pytest
+
+from stages.extract.apis.tally import execution
+
+
+@pytest.fixture(autouse=True)
+def unlimited(monkeypatch):
+    async def limited(endpoint, request):
+        return await request()
+
+    monkeypatch.setattr(execution, "limited", limited)
+
+
+@pytest.fixture
+def tally_votes() -> dict[str, list[dict]]:
+    return {
+        "1": [{"id": f"1-{vote_index}"} for vote_index in range(25)],
+        "2": [{"id": f"2-{vote_index}"} for vote_index in range(10)],
+        "3": [],
+    }
+
+
+@pytest.fixture
+def fake_tally(monkeypatch, tally_votes):
+    class FakeSession:
+        async def execute(self, query):
+            proposal_ids, upper_limit, skip = query
+            return {
+                "proposals": [
+                    {
+                        "id": proposal_id,
+                        "title": f"Proposal {proposal_id}",
+                        "votes": tally_votes[proposal_id][skip : skip + upper_limit],
+                    }
+                    for proposal_id in proposal_ids
+                ]
+            }
+
+    async def get_session():
+        return FakeSession()
+
+    def votes(chain_id, proposal_ids, governance_ids, upper_limit, skip):
+        return proposal_ids, upper_limit, skip
+
+    monkeypatch.setattr(execution, "get_session", get_session)
+    monkeypatch.setattr(execution, "votes", votes)
+
+
+def test_get_votes_pages_each_proposal(fake_tally, tally_votes):
+    result = run(execution.get_votes("eip155:1", ["1", "2", "3"], upper_limit=10))
+
+    assert list(result) == ["1", "2", "3"]
+    for proposal_id, proposal in result.items():
+        assert proposal["votes"] == tally_votes[proposal_id]
+
+
+@pytest.fixture
+def tally_governances() -> list[dict]:
+    return [
+        {
+            "id": f"gov-{organization_id}",
+            "organization": {"id": str(organization_id)},
+            "proposals": [
+                {"id": f"{organization_id}-{proposal_index}"}
+                for proposal_index in range(organization_id * 4)
+            ],
+        }
+        for organization_id in range(1, 13)
+    ]
+
+
+@pytest.fixture
+def fake_tally_governances(monkeypatch, tally_governances):
+    class FakeSession:
+        async def execute(self, query):
+            organization_ids, upper_limit, skip = query
+            return {
+                "governances": [
+                    {
+                        **governance,
+                        "proposals": governance["proposals"][skip : skip + upper_limit],
+                    }
+                    for governance in tally_governances
+                    if governance["organization"]["id"] in organization_ids
+                ]
+            }
+
+    async def get_session():
+        return FakeSession()
+
+    def proposals(schema, organization_ids, upper_limit, skip):
+        return organization_ids, upper_limit, skip
+
+    async def get_dsl_schema(get_session):
+        return None
+
+    monkeypatch.setattr(execution, "get_session", get_session)
+    monkeypatch.setattr(execution, "get_dsl_schema", get_dsl_schema)
+    monkeypatch.setattr(execution, "proposals", proposals)
+
+
+def test_get_proposals_pages_every_batch(fake_tally_governances, tally_governances):
+    organization_ids = [str(organization_id) for organization_id in range(1, 13)]
+
+    result = run(execution.get_proposals(organization_ids, upper_limit=8))
+
+    assert organization_ids == [
+        str(organization_id) for organization_id in range(1, 13)
+    ]
+    assert result["governances"] == tally_governances
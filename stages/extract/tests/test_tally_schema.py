@@ -0,0 +1,93 @@
+from asyncio import run
+from json import dump
+
+import pytest
+from graphql import build_schema, introspection_from_schema
+
+from stages.extract.apis.tally import schema
+
+
+@pytest.fixture
+def introspection() -> dict:
+    return introspection_from_schema(
+        build_schema(
+            "type Governance { id: ID! } type Query { governances: [Governance] }"
+        )
+    )
+
+
+def test_saved_introspection_loads_offline(tmp_path, introspection):
+    cache_path = tmp_path / "tally_schema.json"
+    schema.save_introspection(introspection, cache_path)
+
+    assert schema.load_introspection(cache_path) == introspection
+    assert schema.load_dsl_schema(cache_path).Query.governances
+
+
+def test_expired_introspection_is_ignored(tmp_path, introspection):
+    cache_path = tmp_path / "tally_schema.json"
+    schema.save_introspection(introspection, cache_path)
+
+    assert schema.load_introspection(cache_path, ttl=-1) is None
+    assert schema.load_introspection(cache_path, ttl=None) == introspection
+
+
+def test_other_cache_versions_are_ignored(tmp_path, introspection):
+    cache_path = tmp_path / "tally_schema.json"
+    with open(cache_path, "w") as cache_file:
+        dump(
+            {"version": "0", "fetched_at": 0, "introspection": introspection},
+            cache_file,
+        )
+
+    assert schema.load_introspection(cache_path, ttl=None) is None
+    assert schema.load_dsl_schema(cache_path) is None
+
+
+class FakeSession:
+    def __init__(self, introspection: dict):
+        self.introspection = introspection
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        return self.introspection
+
+
+def use_session(session: FakeSession):
+    async def get_session():
+        return session
+
+    return get_session
+
+
+def test_get_dsl_schema_builds_from_the_cache_offline(
+    monkeypatch, tmp_path, introspection
+):
+    monkeypatch.setattr(schema, "_dsl_schema", None)
+    cache_path = tmp_path / "tally_schema.json"
+    schema.save_introspection(introspection, cache_path)
+
+    async def get_session():
+        raise AssertionError("The cached schema needs no session")
+
+    assert run(schema.get_dsl_schema(get_session, cache_path)).Query.governances
+
+
+def test_get_dsl_schema_introspects_once_without_a_cache(
+    monkeypatch, tmp_path, introspection
+):
+    monkeypatch.setattr(schema, "_dsl_schema", None)
+    cache_path = tmp_path / "tally_schema.json"
+    session = FakeSession(introspection)
+
+    async def get_schemas():
+        return [
+            await schema.get_dsl_schema(use_session(session), cache_path)
+            for _ in range(2)
+        ]
+
+    first_schema, second_schema = run(get_schemas())
+    assert first_schema is second_schema
+    assert session.queries == 1
+    assert schema.load_introspection(cache_path) == introspection
@@ -1,27 +1,93 @@
+from itertools import chain
+from typing import Iterator
+
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .datatypes import ProposalTables
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    frame = pd.concat(frames)
+    # Batches have their own categories, which pandas would turn into objects
+    for column in frame.columns:
+        if frame[column].dtype != "category" and all(
+            column in batch and batch[column].dtype == "category" for batch in frames
+        ):
+            frame[column] = union_categoricals([batch[column] for batch in frames])
+    return frame
+
+
+def drop_duplicate_proposals(proposal_tables: ProposalTables) -> ProposalTables:
+    # The same space can be listed twice, e.g. under two DeepDAO names
+    duplicated_proposals = proposal_tables.proposals.index.duplicated()
+    if not duplicated_proposals.any():
+        return proposal_tables
+    return ProposalTables(
+        proposal_tables.proposals[~duplicated_proposals],
+        proposal_tables.votes[~proposal_tables.votes["id"].duplicated().to_numpy()],
+        proposal_tables.organization_name,
+    )
 
 
-def into_organization_dataframes(
-    filtered_propsal_dataframes: list[pd.DataFrame],
-) -> list[pd.DataFrame]:
-    organization_map: dict[str, list[pd.DataFrame]] = dict()
-    for proposal_df in filtered_propsal_dataframes:
-        if proposal_df.empty:
+def concat_tables(
+    proposal_tables: list[ProposalTables], organization_name: str | None = None
+) -> ProposalTables:
+    return drop_duplicate_proposals(
+        ProposalTables(
+            concat_frames(
+                [proposal_table.proposals for proposal_table in proposal_tables]
+            ),
+            concat_frames([proposal_table.votes for proposal_table in proposal_tables]),
+            organization_name,
+        )
+    )
+
+
+def get_organization_name(proposal_tables: ProposalTables) -> str:
+    if proposal_tables.organization_name is not None:
+        return proposal_tables.organization_name
+    return proposal_tables.proposals["proposal_organization_name"].iat[0]
+
+
+def group_by_organization(
+    proposal_tables: list[ProposalTables],
+) -> dict[str, list[ProposalTables]]:
+    organization_map: dict[str, list[ProposalTables]] = dict()
+    for proposal_table in proposal_tables:
+        if proposal_table.empty:
             continue
-        organization_name: str = proposal_df.iloc[0]["proposal_organization_name"]
-        if organization_name not in organization_map.keys():
-            organization_map[organization_name] = []
-        organization_map[organization_name].append(proposal_df)
+        organization_map.setdefault(get_organization_name(proposal_table), []).append(
+            proposal_table
+        )
+    return organization_map
+
+
+def iterate_organization_tables(
+    filtered_proposal_tables: list[ProposalTables],
+) -> Iterator[ProposalTables]:
+    # Each organization is only concatenated when the consumer asks for it
+    for organization_name, organization_tables in group_by_organization(
+        filtered_proposal_tables
+    ).items():
+        yield concat_tables(organization_tables, organization_name)
 
-    organization_dfs = []
-    for organization in organization_map.keys():
-        organization_df = pd.concat(organization_map[organization])
-        organization_dfs.append(organization_df)
 
-    return organization_dfs
+def into_organization_tables(
+    filtered_proposal_tables: list[ProposalTables],
+) -> list[ProposalTables]:
+    return list(iterate_organization_tables(filtered_proposal_tables))
 
 
-def into_single_dataframe(
-    filtered_propsal_dataframes: list[pd.DataFrame],
-) -> pd.DataFrame:
-    return pd.concat(into_organization_dataframes(filtered_propsal_dataframes))
+def into_single_tables(
+    filtered_proposal_tables: list[ProposalTables],
+) -> ProposalTables:
+    # Ordering the batches by organization first keeps the result grouped by
+    # organization with a single concatenation
+    return concat_tables(
+        list(
+            chain.from_iterable(
+                group_by_organization(filtered_proposal_tables).values()
+            )
+        )
+    )
@@ -0,0 +1,133 @@
+def get_scores(proposal_type: str, choices: list[str], votes: list[dict]) -> list:
+    scores = [0.0] * len(choices)
+    for vote in votes:
+        if proposal_type == "approval":
+            for choice in vote["choice"]:
+                scores[choice - 1] += vote["vp"]
+        elif proposal_type == "weighted":
+            weight_total = sum(vote["choice"].values())
+            for choice, weight in vote["choice"].items():
+                scores[int(choice) - 1] += vote["vp"] * weight / weight_total
+        else:
+            scores[vote["choice"] - 1] += vote["vp"]
+    return scores
+
+
+def make_proposal(
+    proposal_id: str,
+    proposal_type: str,
+    choices: list[str],
+    organization: tuple[str, str],
+    raw_votes: list[tuple[str, float, int | list | dict]],
+    created: int,
+) -> dict[str, dict]:
+    organization_name, organization_id = organization
+    votes = [
+        {
+            "id": f"{proposal_id}-{voter}",
+            "voter": voter,
+            "choice": choice,
+            "created": created + vote_index,
+            "vp": vp,
+        }
+        for vote_index, (voter, vp, choice) in enumerate(raw_votes)
+    ]
+    scores = get_scores(proposal_type, choices, votes)
+    for vote in votes:
+        vote["proposal_id"] = proposal_id
+    return {
+        proposal_id: {
+            "proposal": {
+                "id": proposal_id,
+                "organization_name": organization_name,
+                "organization_id": organization_id,
+            },
+            "proposal_row": {
+                "proposal_id": proposal_id,
+                "proposal_title": f"Proposal {proposal_id}",
+                "proposal_created": created,
+                "proposal_start": created,
+                "proposal_end": created + 86400,
+                "proposal_scores_total": sum(scores),
+                "proposal_state": "closed",
+                "proposal_organization_name": organization_name,
+                "proposal_type": proposal_type,
+                "proposal_scores": scores,
+                "proposal_choices": choices,
+                "organization_id": f"{organization_name}ID",
+                "proposal_organization_id": organization_id,
+            },
+            "votes": votes,
+        }
+    }
+
+
+def get_denormalized_payload(proposal_payload: dict) -> dict:
+    proposal_row = proposal_payload["proposal_row"]
+    return {
+        "proposal": proposal_payload["proposal"],
+        "votes": [
+            {
+                **vote,
+                **proposal_row,
+                "proposal_scores": list(proposal_row["proposal_scores"]),
+            }
+            for vote in proposal_payload["votes"]
+        ],
+    }
+
+
+good_dao = ("GoodDAO", "good.eth")
+kinda_good_dao = ("KindaGoodDAO", "kindagood.eth")
+voters = [f"0x{voter_index:040x}" for voter_index in range(1, 41)]
+
+dao_snapshot_data = [
+    {
+        **make_proposal(
+            "0xsingle",
+            "single-choice",
+            ["For", "Against", "Abstain"],
+            good_dao,
+            [
+                (voter, float(voter_index**2 + 1), voter_index % 3 + 1)
+                for voter_index, voter in enumerate(voters[:30])
+            ],
+            1672531200,
+        ),
+        **make_proposal(
+            "0xapproval",
+            "approval",
+            ["A", "B", "C", "D"],
+            good_dao,
+            [
+                (voter, float(1000 - voter_index * 20), [1 + voter_index % 4, 4])
+                for voter_index, voter in enumerate(voters[10:35])
+            ],
+            1672617600,
+        ),
+    },
+    {
+        **make_proposal(
+            "0xweighted",
+            "weighted",
+            ["Pool 1", "Pool 2", "Pool 3"],
+            kinda_good_dao,
+            [
+                (voter, float(voter_index + 1) * 3.5, {"1": voter_index % 5, "3": 2})
+                for voter_index, voter in enumerate(voters[:40])
+            ],
+            1672704000,
+        ),
+        **make_proposal(
+            "0xbasic",
+            "basic",
+            ["For", "Against", "Abstain"],
+            kinda_good_dao,
+            [
+                (voter, 2.0 ** (voter_index % 12), voter_index % 2 + 1)
+                for voter_index, voter in enumerate(voters[5:25])
+            ],
+            1672790400,
+        ),
+    },
+]
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from stages import dataframes
+from stages.tests.constants import dao_snapshot_data, get_denormalized_payload
+
+
+def get_payload(proposal_id: str) -> dict:
+    for dao in dao_snapshot_data:
+        if proposal_id in dao:
+            return dao[proposal_id]
+
+
+def get_votes(proposal_id: str) -> list[dict]:
+    return get_denormalized_payload(get_payload(proposal_id))["votes"]
+
+
+def test_create_dataframe_from_builds_typed_columns():
+    votes = get_votes("0xsingle")
+    proposal_df = dataframes.create_dataframe_from(votes)
+
+    assert proposal_df.index.name == "Voter Address"
+    assert list(proposal_df.index) == [vote["voter"] for vote in votes]
+    assert list(proposal_df.columns) == list(votes[0])
+    assert proposal_df["vp"].dtype == "float64"
+    assert proposal_df["proposal_scores_total"].dtype == "float64"
+    assert proposal_df["created"].dtype == "int64"
+    assert isinstance(proposal_df["proposal_id"].dtype, pd.CategoricalDtype)
+    assert isinstance(proposal_df["proposal_type"].dtype, pd.CategoricalDtype)
+    assert proposal_df["proposal_scores"].iloc[0] == votes[0]["proposal_scores"]
+
+
+def test_create_dataframe_from_drops_missing_and_duplicate_votes():
+    votes = get_votes("0xapproval")
+    duplicate_vote = dict(votes[0], vp=0.0)
+    proposal_df = dataframes.create_dataframe_from([None, *votes, duplicate_vote, {}])
+
+    assert len(proposal_df) == len(votes)
+    assert proposal_df["vp"].iloc[0] == votes[0]["vp"]
+
+
+def test_create_dataframe_from_keeps_mixed_columns_untyped():
+    votes = [
+        dict(vote, created=str(vote["created"]), proposal_type=None)
+        for vote in get_votes("0xbasic")
+    ]
+    proposal_df = dataframes.create_dataframe_from(votes)
+
+    assert proposal_df["created"].dtype == object
+    assert proposal_df["proposal_type"].isna().all()
+
+
+def test_create_dataframe_from_empty_votes():
+    assert dataframes.create_dataframe_from([]).empty
+
+
+def test_create_tables_from_stores_proposal_fields_once():
+    proposal_tables = dataframes.create_tables_from(get_payload("0xweighted"))
+
+    assert list(proposal_tables.proposals.index) == ["0xweighted"]
+    assert proposal_tables.proposals.loc["0xweighted", "proposal_type"] == "weighted"
+    assert list(proposal_tables.votes.columns) == [
+        "id",
+        "voter",
+        "choice",
+        "created",
+        "vp",
+        "proposal_id",
+    ]
+
+
+def test_denormalized_tables_match_denormalized_votes():
+    for proposal_id in ["0xsingle", "0xapproval", "0xweighted", "0xbasic"]:
+        denormalized_payload = get_denormalized_payload(get_payload(proposal_id))
+        proposal_tables = dataframes.create_tables_from(get_payload(proposal_id))
+        legacy_tables = dataframes.create_tables_from(denormalized_payload)
+
+        assert (
+            proposal_tables.denormalize().to_csv()
+            == legacy_tables.denormalize().to_csv()
+            == dataframes.create_dataframe_from(denormalized_payload["votes"]).to_csv()
+        )
@@ -0,0 +1,151 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pytest
+
+from stages import dataframes, export, merge
+from stages.tests.constants import dao_snapshot_data, good_dao, make_proposal, voters
+
+
+def get_tables():
+    return merge.into_single_tables(dataframes.all_proposals(dao_snapshot_data))
+
+
+def get_report():
+    return get_tables().denormalize()
+
+
+def test_dataframe_to_arrow_keeps_native_types():
+    report = get_tables()
+    proposals_table = export.dataframe_to_arrow(report.proposals)
+    votes_table = export.dataframe_to_arrow(report.votes)
+
+    assert votes_table.schema.field("Voter Address").type == pa.dictionary(
+        pa.int32(), pa.string()
+    )
+    assert proposals_table.schema.field("proposal_type").type == pa.dictionary(
+        pa.int32(), pa.string()
+    )
+    assert proposals_table.schema.field("proposal_scores").type == pa.list_(
+        pa.float64()
+    )
+    assert proposals_table.schema.field("proposal_choices").type == pa.list_(
+        pa.string()
+    )
+    assert votes_table.schema.field("vp").type == pa.float64()
+    assert votes_table.schema.field("choice").type == pa.string()
+
+
+def test_organization_dataframes_to_parquet_partitions_by_organization(tmp_path):
+    report = get_tables()
+    export.organization_dataframes_to_parquet(report, str(tmp_path), "zstd")
+    export.organization_dataframes_to_parquet(report, str(tmp_path), "zstd")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["proposals", "votes"]
+    assert sorted(path.name for path in (tmp_path / "votes").iterdir()) == [
+        "proposal_organization_name=GoodDAO",
+        "proposal_organization_name=KindaGoodDAO",
+    ]
+
+    votes = ds.dataset(tmp_path / "votes", partitioning="hive")
+    proposals = ds.dataset(tmp_path / "proposals", partitioning="hive")
+    weighted_filter = ds.field("proposal_id") == "0xweighted"
+    weighted_proposal = proposals.to_table(filter=weighted_filter)
+    assert weighted_proposal.num_rows == 1
+    assert weighted_proposal.column("proposal_scores")[0].as_py() == list(
+        report.proposals.loc["0xweighted", "proposal_scores"]
+    )
+    assert votes.to_table(filter=weighted_filter).num_rows == len(
+        report.votes[report.votes["proposal_id"] == "0xweighted"]
+    )
+    assert votes.count_rows() == len(report.votes)
+    assert proposals.count_rows() == len(report.proposals)
+
+
+def test_parquet_writer_handles_more_than_1024_proposals(tmp_path):
+    report = merge.into_single_tables(
+        dataframes.all_proposals(
+            [
+                make_proposal(
+                    f"0x{proposal_index:04x}",
+                    "single-choice",
+                    ["For", "Against"],
+                    good_dao,
+                    [(voters[0], 1.0, 1), (voters[1], 2.0, 2)],
+                    1672531200 + proposal_index,
+                )
+                for proposal_index in range(1100)
+            ]
+        )
+    )
+    export.organization_dataframes_to_parquet(report, str(tmp_path), "zstd")
+
+    proposals = ds.dataset(tmp_path / "proposals", partitioning="hive")
+    votes = ds.dataset(tmp_path / "votes", partitioning="hive")
+    assert proposals.count_rows() == 1100
+    assert votes.count_rows() == 2200
+
+
+def test_parquet_writer_replaces_previous_runs(tmp_path):
+    report = get_tables()
+    export.organization_dataframes_to_parquet(report, str(tmp_path), "zstd")
+    good_dao_tables = merge.into_single_tables(
+        dataframes.all_proposals(dao_snapshot_data[:1])
+    )
+    export.organization_dataframes_to_parquet(good_dao_tables, str(tmp_path), "zstd")
+
+    assert [path.name for path in (tmp_path / "votes").iterdir()] == [
+        "proposal_organization_name=GoodDAO"
+    ]
+    votes = ds.dataset(tmp_path / "votes", partitioning="hive")
+    assert votes.count_rows() == len(good_dao_tables.votes)
+
+
+def test_streamed_parquet_writes_keep_every_batch(tmp_path):
+    with export.ParquetDatasetWriter(str(tmp_path)) as writer:
+        for proposal_tables in dataframes.all_proposals(dao_snapshot_data):
+            writer.write_tables(proposal_tables)
+
+    proposals = ds.dataset(tmp_path / "proposals", partitioning="hive")
+    assert sorted(proposals.to_table().column("proposal_id").to_pylist()) == sorted(
+        get_tables().proposals.index
+    )
+
+
+def read_compressed(path, compression: str) -> str:
+    with pa.CompressedInputStream(pa.OSFile(str(path)), compression) as stream:
+        return stream.read().decode()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd", "lz4"])
+def test_csv_writer_matches_pandas_output(tmp_path, compression):
+    report = get_report()
+    file_name = str(tmp_path / "report.csv")
+    with export.CsvWriter(file_name, compression, chunk_rows=7, workers=3) as writer:
+        writer.write(report)
+
+    extension = export.CSV_EXTENSIONS[compression]
+    assert read_compressed(file_name + extension, compression) == report.to_csv()
+
+
+def test_csv_writer_appends_without_repeating_header(tmp_path):
+    report = get_report()
+    file_name = str(tmp_path / "report.csv")
+    with export.CsvWriter(file_name, "none", chunk_rows=10) as writer:
+        for _, proposal_votes in report.groupby("proposal_id", sort=False):
+            writer.write(proposal_votes)
+
+    with open(file_name) as csv_file:
+        assert csv_file.read() == report.to_csv()
+
+
+def test_organization_dataframes_to_csv_is_readable_by_pandas(tmp_path):
+    report = get_report()
+    file_name = str(tmp_path / "report.csv")
+    export.organization_dataframes_to_csv(get_tables(), file_name)
+
+    exported_report = pd.read_csv(
+        file_name + ".gzip", compression="gzip", index_col="Voter Address"
+    )
+    assert len(exported_report) == len(report)
+    assert list(exported_report["proposal_id"]) == list(report["proposal_id"])
@@ -0,0 +1,83 @@
+from types import GeneratorType
+
+from stages import dataframes, merge
+from stages.tests.constants import dao_snapshot_data
+
+
+def get_interleaved_tables():
+    good_dao, kinda_good_dao = [
+        dataframes.all_proposals([dao]) for dao in dao_snapshot_data
+    ]
+    return [good_dao[0], kinda_good_dao[0], good_dao[1], kinda_good_dao[1]]
+
+
+def test_create_tables_from_tags_the_organization():
+    assert [
+        proposal_tables.organization_name
+        for proposal_tables in get_interleaved_tables()
+    ] == ["GoodDAO", "KindaGoodDAO", "GoodDAO", "KindaGoodDAO"]
+
+
+def test_into_single_tables_groups_proposals_by_organization():
+    single_tables = merge.into_single_tables(get_interleaved_tables())
+
+    assert list(single_tables.proposals.index) == [
+        "0xsingle",
+        "0xapproval",
+        "0xweighted",
+        "0xbasic",
+    ]
+    assert list(single_tables.votes["proposal_id"].unique()) == list(
+        single_tables.proposals.index
+    )
+    assert single_tables.organization_name is None
+
+
+def test_iterate_organization_tables_is_lazy():
+    organization_tables = merge.iterate_organization_tables(get_interleaved_tables())
+
+    assert isinstance(organization_tables, GeneratorType)
+    good_dao, kinda_good_dao = organization_tables
+    assert good_dao.organization_name == "GoodDAO"
+    assert list(good_dao.proposals.index) == ["0xsingle", "0xapproval"]
+    assert kinda_good_dao.organization_name == "KindaGoodDAO"
+    assert len(kinda_good_dao.votes) == 60
+
+
+def test_into_single_tables_skips_empty_tables():
+    empty_tables = dataframes.create_tables_from({"votes": []})
+    single_tables = merge.into_single_tables([empty_tables, *get_interleaved_tables()])
+
+    assert len(single_tables.proposals) == 4
+
+
+def test_into_single_tables_drops_duplicate_proposals():
+    single_tables = merge.into_single_tables(
+        dataframes.all_proposals([dao_snapshot_data[0], dao_snapshot_data[0]])
+    )
+
+    assert list(single_tables.proposals.index) == ["0xsingle", "0xapproval"]
+    assert single_tables.votes["id"].is_unique
+    assert len(single_tables.votes) == len(
+        merge.into_single_tables(dataframes.all_proposals([dao_snapshot_data[0]])).votes
+    )
+
+
+def test_into_single_tables_keeps_categorical_columns():
+    proposal_tables = get_interleaved_tables()
+    single_tables = merge.into_single_tables(proposal_tables)
+
+    assert single_tables.votes["proposal_id"].dtype == "category"
+    assert list(single_tables.votes["proposal_id"].cat.categories) == list(
+        single_tables.proposals.index
+    )
+    assert list(single_tables.votes["proposal_id"]) == [
+        proposal_id
+        for organization_tables in merge.group_by_organization(
+            proposal_tables
+        ).values()
+        for tables in organization_tables
+        for proposal_id in tables.votes["proposal_id"]
+    ]
+    assert single_tables.votes["created"].dtype == "int64"
+    assert single_tables.votes["vp"].dtype == "float64"
@@ -0,0 +1,84 @@
+from asyncio import run
+
+import click
+import pytest
+
+import pipeline
+from datatypes import DaoData
+from stages import export
+from stages.tests.constants import dao_snapshot_data
+
+
+async def stream_proposal_payloads():
+    for dao in dao_snapshot_data:
+        for proposal_id, proposal in dao.items():
+            yield {proposal_id: proposal}
+
+
+@pytest.fixture
+def reports():
+    return pipeline.get_reports(DaoData("plutocracy", dao_snapshot_data))
+
+
+def test_streamed_reports_match_batch_reports(tmp_path, reports):
+    unfiltered_path = str(tmp_path / "report.csv")
+    filtered_path = str(tmp_path / "report_filtered.csv")
+    with export.CsvWriter(unfiltered_path, "none") as unfiltered_writer:
+        with export.CsvWriter(filtered_path, "none") as filtered_writer:
+            number_of_proposals = run(
+                pipeline.stream_reports(
+                    stream_proposal_payloads(), unfiltered_writer, filtered_writer
+                )
+            )
+
+    assert number_of_proposals == 4
+    with open(unfiltered_path) as unfiltered_report:
+        assert unfiltered_report.read() == reports.unfiltered.denormalize().to_csv()
+    with open(filtered_path) as filtered_report:
+        assert filtered_report.read() == reports.filtered.denormalize().to_csv()
+
+
+def test_parallel_reports_match_batch_reports(reports):
+    parallel_reports = pipeline.get_reports(
+        DaoData("plutocracy", dao_snapshot_data), workers=2
+    )
+
+    assert (
+        parallel_reports.unfiltered.denormalize().to_csv()
+        == reports.unfiltered.denormalize().to_csv()
+    )
+    assert (
+        parallel_reports.filtered.denormalize().to_csv()
+        == reports.filtered.denormalize().to_csv()
+    )
+
+
+def test_reports_of_a_dao_listed_twice_match_a_single_listing():
+    reports = pipeline.get_reports(DaoData("plutocracy", [dao_snapshot_data[0]]))
+    duplicated_reports = pipeline.get_reports(
+        DaoData("plutocracy", [dao_snapshot_data[0], dao_snapshot_data[0]])
+    )
+
+    assert (
+        duplicated_reports.unfiltered.denormalize().to_csv()
+        == reports.unfiltered.denormalize().to_csv()
+    )
+    assert (
+        duplicated_reports.filtered.denormalize().to_csv()
+        == reports.filtered.denormalize().to_csv()
+    )
+
+
+@pytest.mark.parametrize(
+    "compression, compression_level, message",
+    [
+        ("snappy", 3, "snappy has no compression levels"),
+        ("zstd", 100, "zstd levels go from"),
+        ("bz2", None, "bz2 is not available for parquet"),
+    ],
+)
+def test_get_compression_rejects_invalid_levels(
+    compression, compression_level, message
+):
+    with pytest.raises(click.BadParameter, match=message):
+        pipeline.get_compression("parquet", compression, compression_level)
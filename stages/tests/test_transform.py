@@ -0,0 +1,46 @@
+import pandas as pd
+
+from stages import dataframes, merge, transform
+from stages.tests.constants import dao_snapshot_data
+
+
+def get_single_tables():
+    return merge.into_single_tables(dataframes.all_proposals(dao_snapshot_data))
+
+
+def test_decoded_tables_match_encoded_tables():
+    single_tables = get_single_tables()
+    decoded_tables = transform.decode_tables(transform.encode_tables(single_tables))
+
+    pd.testing.assert_frame_equal(decoded_tables.proposals, single_tables.proposals)
+    pd.testing.assert_frame_equal(decoded_tables.votes, single_tables.votes)
+    assert decoded_tables.organization_name == single_tables.organization_name
+
+
+def test_decoded_dataframe_keeps_irregular_values():
+    dataframe = pd.DataFrame(
+        {
+            "choice": [1, [1, 3], {"1": 1, "2": 3}],
+            "scores": [[1, 2], [1.5], []],
+            "voter": ["0xa", "0xb", "0xc"],
+            "vp": [1.0, 2.5, 3.0],
+        },
+        index=pd.Index(["0xp", "0xp", "0xq"], name="proposal_id"),
+    )
+    decoded_dataframe = transform.decode_dataframe(
+        transform.encode_dataframe(dataframe)
+    )
+
+    pd.testing.assert_frame_equal(decoded_dataframe, dataframe)
+    assert list(map(type, decoded_dataframe["scores"].iloc[0])) == [int, int]
+
+
+def test_transform_in_parallel_keeps_organization_order():
+    parallel_tables = list(transform.transform_in_parallel(dao_snapshot_data, 2))
+
+    assert [
+        unfiltered_tables.organization_name for unfiltered_tables, _ in parallel_tables
+    ] == ["GoodDAO", "KindaGoodDAO"]
+    assert [
+        filtered_tables.organization_name for _, filtered_tables in parallel_tables
+    ] == ["GoodDAO", "KindaGoodDAO"]
@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from json import dumps, loads
+from multiprocessing import get_all_start_methods, get_context
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+
+from . import dataframe_filters, dataframes, merge
+from .datatypes import ProposalTables
+
+
+# Arrow IPC stream of the regular columns and a JSON object holding the
+# irregular ones
+EncodedDataFrame = tuple[pa.Buffer, bytes]
+EncodedTables = tuple[EncodedDataFrame, EncodedDataFrame, str | None]
+
+# Raw API data that forked workers inherit instead of receiving it pickled
+_dao_snapshot_datas: list[dict[str, dict]] = []
+
+
+def is_json_column(values: pd.Series) -> bool:
+    # Arrow keeps numbers and strings as they are, anything else (choices,
+    # score lists, Tally block dicts) goes through JSON to keep int and
+    # float values exactly as they were
+    return values.dtype == object and pd.api.types.infer_dtype(
+        values, skipna=True
+    ) not in ("string", "empty")
+
+
+def encode_dataframe(dataframe: pd.DataFrame) -> EncodedDataFrame:
+    json_columns = [
+        column for column in dataframe.columns if is_json_column(dataframe[column])
+    ]
+    table = pa.Table.from_pandas(
+        dataframe.drop(columns=json_columns), preserve_index=True
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    # A single dumps call per frame is much faster than one per value
+    json_values = dumps(
+        {
+            "columns": list(dataframe.columns),
+            "values": {column: list(dataframe[column]) for column in json_columns},
+        }
+    )
+    return sink.getvalue(), json_values.encode()
+
+
+def decode_dataframe(encoded_dataframe: EncodedDataFrame) -> pd.DataFrame:
+    buffer, json_values = encoded_dataframe
+    dataframe = pa.ipc.open_stream(buffer).read_all().to_pandas()
+    json_values = loads(json_values)
+    for column, values in json_values["values"].items():
+        dataframe[column] = pd.Series(values, dataframe.index, dtype=object)
+    return dataframe[json_values["columns"]]
+
+
+def encode_tables(proposal_tables: ProposalTables) -> EncodedTables:
+    return (
+        encode_dataframe(proposal_tables.proposals),
+        encode_dataframe(proposal_tables.votes),
+        proposal_tables.organization_name,
+    )
+
+
+def decode_tables(encoded_tables: EncodedTables) -> ProposalTables:
+    encoded_proposals, encoded_votes, organization_name = encoded_tables
+    return ProposalTables(
+        decode_dataframe(encoded_proposals),
+        decode_dataframe(encoded_votes),
+        organization_name,
+    )
+
+
+def transform_dao(
+    dao_snapshot_data: dict[str, dict],
+) -> list[tuple[EncodedTables, EncodedTables]]:
+    return [
+        (
+            encode_tables(organization_tables),
+            encode_tables(
+                dataframe_filters.filter_top_shareholders_from_tables(
+                    organization_tables
+                )
+            ),
+        )
+        for organization_tables in merge.iterate_organization_tables(
+            dataframes.all_proposals([dao_snapshot_data])
+        )
+    ]
+
+
+def transform_dao_at(dao_index: int) -> list[tuple[EncodedTables, EncodedTables]]:
+    return transform_dao(_dao_snapshot_datas[dao_index])
+
+
+def transform_in_parallel(
+    dao_snapshot_datas: list[dict[str, dict]], workers: int
+) -> Iterator[tuple[ProposalTables, ProposalTables]]:
+    global _dao_snapshot_datas
+
+    validated_dao_data = [dao for dao in dao_snapshot_datas if type(dao) is dict]
+    print(f"Generating and filtering DFs for each dao on {workers} workers")
+    if "fork" in get_all_start_methods():
+        _dao_snapshot_datas = validated_dao_data
+        executor = ProcessPoolExecutor(workers, get_context("fork"))
+        tasks = executor.map(transform_dao_at, range(len(validated_dao_data)))
+    else:
+        executor = ProcessPoolExecutor(workers)
+        tasks = executor.map(transform_dao, validated_dao_data)
+
+    try:
+        # `map` yields in submission order, so the reports do not depend on
+        # which worker finishes first
+        for dao_tables in tasks:
+            for unfiltered_tables, filtered_tables in dao_tables:
+                yield decode_tables(unfiltered_tables), decode_tables(filtered_tables)
+    finally:
+        executor.shutdown()
+        _dao_snapshot_datas = []